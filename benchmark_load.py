@@ -0,0 +1,322 @@
+# Load test for the three web servers. Each server is started in its own
+# python3 process with the host/ stand-ins for the board and for GitHub, then
+# driven by client threads with a weighted mix of paths. Runs on a computer
+# only: python3 benchmark_load.py --help
+#
+# Prints one table row per run, and with --json appends one JSON object per
+# run to a file, so numbers from different versions can be compared.
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from stage_timing import percentile
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+HOST = os.path.join(REPO, "host")
+SOURCE_FILE = os.path.join(REPO, "portfolios.json")
+
+START_TIMEOUT = 30  # Seconds a server may take to start listening
+STOP_TIMEOUT = 10  # Seconds a server may take to stop after Ctrl+C
+REQUEST_TIMEOUT = 10  # Seconds before a request counts as an error
+UNKNOWN_USERS = 50  # Distinct unknown usernames in the path mix
+
+# Code each server process runs; {keep_alive} is filled in per run, and a
+# server without it has no keep-alive setting and is only run with it off
+SERVERS = {
+    "portfolio": "import portfolio_web_server as s\n"
+    "s.KEEP_ALIVE = {keep_alive}\n"
+    "s.start_portfolio_server(use_async=True)",
+    "portfolio_blocking": "import portfolio_web_server as s\n"
+    "s.KEEP_ALIVE = {keep_alive}\n"
+    "s.start_portfolio_server(use_async=False)",
+    "simple_portfolio": "import simple_portfolio_server as s\n"
+    "s.KEEP_ALIVE = {keep_alive}\n"
+    "s.start_portfolio_server()",
+    "simple_web": "import simple_web_server as s\ns.start_server()",
+}
+
+# Extra environment per server, on top of the host/ settings
+SERVER_ENV = {
+    # Its GitHub URL is a placeholder, so every URL serves the one portfolio
+    "simple_portfolio": {"HOST_URL_FILE": "portfolio.json"},
+}
+
+DEFAULT_MIX = "home=2,known=5,unknown=2,led=1"
+
+
+def server_paths(name):
+    # Path kind -> paths of that kind the server answers
+    with open(SOURCE_FILE) as f:
+        usernames = [p["github"] for p in json.load(f) if p.get("github")]
+    unknown = [f"/no-such-user-{i}" for i in range(UNKNOWN_USERS)]
+    if name.startswith("portfolio"):
+        known = ["/" + username for username in usernames]
+        return {"home": ["/"], "known": known, "unknown": unknown}
+    if name == "simple_portfolio":
+        return {"home": ["/"], "unknown": unknown}  # One portfolio on every path
+    return {"home": ["/"], "unknown": unknown, "led": ["/on", "/off"]}
+
+
+def parse_mix(text):
+    # "home=2,known=5" -> {"home": 2, "known": 5}
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        mix[kind.strip()] = int(weight or 1)
+    return mix
+
+
+def free_port():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def wait_listening(process, port, log_path):
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            socket.create_connection(("127.0.0.1", port), 1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    with open(log_path) as f:
+        output = f.read()
+    raise RuntimeError(f"server did not start listening on {port}:\n{output}")
+
+
+def start_server(name, keep_alive, workdir):
+    port = free_port()
+    env = dict(os.environ)
+    env.update(
+        PYTHONPATH=os.pathsep.join((HOST, REPO)),
+        PYTHONUNBUFFERED="1",
+        HOST_HTTP_PORT=str(port),
+        HOST_WIFI_DELAY="0",
+        HOST_URL_ROOT=REPO,
+    )
+    env.pop("HOST_URL_BASE", None)
+    env.update(SERVER_ENV.get(name, {}))
+    code = SERVERS[name].format(keep_alive=keep_alive)
+    log_path = os.path.join(workdir, name + ".log")
+    log_file = open(log_path, "w")
+    process = subprocess.Popen(
+        [sys.executable, "-c", code],
+        cwd=workdir,  # Snapshots and log files stay out of the repo
+        env=env,
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+    )
+    log_file.close()
+    try:
+        wait_listening(process, port, log_path)
+    except Exception:
+        stop_server(process)
+        raise
+    return process, port
+
+
+def stop_server(process):
+    if process.poll() is None:
+        process.send_signal(signal.SIGINT)  # Runs the server's stop handler
+        try:
+            process.wait(STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+class LoadRun:
+    """Client threads sending a fixed number of requests to one server"""
+
+    def __init__(self, port, paths, mix, keep_alive, total):
+        self.port = port
+        # A kind is picked by its weight, then one of its paths at random, so
+        # the mix does not depend on how many paths a kind has
+        self.kinds = []
+        for kind, weight in mix.items():
+            if paths.get(kind):
+                self.kinds.extend([paths[kind]] * weight)
+        self.keep_alive = keep_alive
+        self.total = total
+        self.next_request = iter(range(total)).__next__  # Shared by the threads
+        self.lock = threading.Lock()
+        self.latencies = []  # Seconds per request
+        self.statuses = {}
+        self.body_bytes = 0
+        self.errors = 0
+
+    def worker(self, seed):
+        choice = random.Random(seed).choice
+        headers = {} if self.keep_alive else {"Connection": "close"}
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, REQUEST_TIMEOUT)
+        latencies = []
+        statuses = {}
+        body_bytes = errors = 0
+        while True:
+            try:
+                self.next_request()
+            except StopIteration:
+                break
+            started = time.perf_counter()
+            try:
+                # A closed connection is reopened by http.client, and that
+                # time counts towards the request
+                conn.request("GET", choice(choice(self.kinds)), headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+                continue
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+            body_bytes += len(body)
+            if response.status >= 500:
+                errors += 1
+            if not self.keep_alive:
+                conn.close()
+        conn.close()
+        with self.lock:
+            self.latencies.extend(latencies)
+            for status, count in statuses.items():
+                self.statuses[status] = self.statuses.get(status, 0) + count
+            self.body_bytes += body_bytes
+            self.errors += errors
+
+    def run(self, concurrency):
+        threads = [
+            threading.Thread(target=self.worker, args=(seed,))
+            for seed in range(concurrency)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+
+def revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def supports_keep_alive(name):
+    return "{keep_alive}" in SERVERS[name]
+
+
+def benchmark(name, keep_alive, concurrency, args):
+    # Every run gets a fresh directory, so none boots from a snapshot an
+    # earlier run left behind
+    with tempfile.TemporaryDirectory() as workdir:
+        process, port = start_server(name, keep_alive, workdir)
+        try:
+            paths = server_paths(name)
+            mix = parse_mix(args.mix)
+            if args.warmup:
+                LoadRun(port, paths, mix, keep_alive, args.warmup).run(1)
+            load = LoadRun(port, paths, mix, keep_alive, args.requests)
+            seconds = load.run(concurrency)
+        finally:
+            stop_server(process)
+
+    ordered = sorted(load.latencies)
+    answered = len(ordered)
+    ms = lambda fraction: round(percentile(ordered, fraction) * 1000, 3)
+    return {
+        "server": name,
+        "keep_alive": keep_alive,
+        "concurrency": concurrency,
+        "requests": args.requests,
+        "answered": answered,
+        "errors": load.errors,
+        "statuses": {str(s): n for s, n in sorted(load.statuses.items())},
+        "seconds": round(seconds, 3),
+        "req_per_s": round(answered / seconds, 1) if seconds else 0,
+        "latency_ms": {
+            "p50": ms(0.5) if answered else None,
+            "p95": ms(0.95) if answered else None,
+            "p99": ms(0.99) if answered else None,
+            "max": round(ordered[-1] * 1000, 3) if answered else None,
+        },
+        "bytes_per_response": load.body_bytes // answered if answered else 0,
+        "mix": args.mix,
+        "revision": revision(),
+        "time": int(time.time()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the web servers.")
+    parser.add_argument(
+        "--servers",
+        default=",".join(SERVERS),
+        help="comma-separated servers, from: " + ", ".join(SERVERS),
+    )
+    parser.add_argument(
+        "--concurrency", default="1,4,16", help="comma-separated client counts"
+    )
+    parser.add_argument(
+        "--keep-alive",
+        choices=("on", "off", "both"),
+        default="both",
+        help="reuse connections between requests",
+    )
+    parser.add_argument("--requests", type=int, default=500, help="requests per run")
+    parser.add_argument(
+        "--warmup", type=int, default=20, help="requests sent before each run"
+    )
+    parser.add_argument(
+        "--mix",
+        default=DEFAULT_MIX,
+        help="path kind weights, from: home, known, unknown, led",
+    )
+    parser.add_argument("--json", help="append one JSON object per run to this file")
+    args = parser.parse_args()
+
+    keep_alive_modes = {"on": (True,), "off": (False,), "both": (False, True)}
+    print(
+        "server              keep-alive  conc    req/s   p50 ms   p95 ms   p99 ms"
+        "  bytes/resp  errors"
+    )
+    for name in args.servers.split(","):
+        for keep_alive in keep_alive_modes[args.keep_alive]:
+            if keep_alive and not supports_keep_alive(name):
+                continue
+            for concurrency in map(int, args.concurrency.split(",")):
+                result = benchmark(name, keep_alive, concurrency, args)
+                latency = result["latency_ms"]
+                print(
+                    f"{name:18}  {'on' if keep_alive else 'off':>10}"
+                    f"  {concurrency:4d}  {result['req_per_s']:7.1f}"
+                    f"  {latency['p50'] or 0:7.2f}  {latency['p95'] or 0:7.2f}"
+                    f"  {latency['p99'] or 0:7.2f}"
+                    f"  {result['bytes_per_response']:10d}  {result['errors']:6d}"
+                )
+                if args.json:
+                    with open(args.json, "a") as f:
+                        f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
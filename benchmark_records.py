@@ -0,0 +1,68 @@
+# Compares the heap held by portfolios kept as json.loads dicts against the
+# compact tuple records from portfolio_records. Runs on the ESP32
+# (mpremote run benchmark_records.py, with portfolios.json and
+# portfolio_records.py copied to the board) or on a computer with python3.
+import gc
+import json
+from portfolio_records import make_record
+
+try:
+    mem_alloc = gc.mem_alloc  # MicroPython
+except AttributeError:  # CPython
+    import tracemalloc
+
+    tracemalloc.start()
+    mem_alloc = lambda: tracemalloc.get_traced_memory()[0]
+
+SOURCE_FILE = "portfolios.json"
+RECORD_COUNTS = (100, 1000)
+
+
+def scaled_json(base, count):
+    # JSON text of count copies of the sample records with unique usernames
+    records = []
+    for i in range(count):
+        record = dict(base[i % len(base)])
+        record["github"] = f"{record.get('github', 'user')}-{i}"
+        records.append(record)
+    return json.dumps(records)
+
+
+def load_dicts(text):
+    return json.loads(text)
+
+
+def load_records(text):
+    skill_names = {}
+    return [make_record(record, skill_names) for record in json.loads(text)]
+
+
+def retained_bytes(load, text):
+    # Heap still in use once load() has returned and garbage is collected
+    gc.collect()
+    before = mem_alloc()
+    data = load(text)
+    gc.collect()
+    used = mem_alloc() - before
+    del data
+    return used
+
+
+def main():
+    with open(SOURCE_FILE) as f:
+        base = json.load(f)
+
+    print("records  dict bytes  record bytes  saved")
+    for count in RECORD_COUNTS:
+        text = scaled_json(base, count)
+        dict_bytes = retained_bytes(load_dicts, text)
+        record_bytes = retained_bytes(load_records, text)
+        del text
+        print(
+            f"{count:7d}  {dict_bytes:10d}  {record_bytes:12d}"
+            f"  {100 - record_bytes * 100 // dict_bytes:4d}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
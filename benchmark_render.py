@@ -0,0 +1,202 @@
+# Times the page renderers on synthetic portfolios of growing size, with the
+# heap they need and the size of the page they produce. Roster pages list
+# COUNT portfolios; portfolio pages show one portfolio with COUNT projects.
+# Runs on a computer with the host/ stand-ins
+# (PYTHONPATH=host python3 benchmark_render.py), or on the ESP32 with the
+# server modules copied to the board and smaller RECORD_COUNTS.
+#
+# On CPython, allocations are the objects a render creates: its fragments,
+# the joined page and the encoded bytes. They are all held until a tracemalloc
+# snapshot diff counts them. Peak is the highest heap the render reached while
+# freeing as it goes. MicroPython cannot count blocks or report a peak, so
+# there the collector is paused while rendering and only the bytes allocated
+# are shown.
+import gc
+import sys
+import time
+from portfolio_records import make_record
+import portfolio_web_server
+import simple_portfolio_server
+
+MICROPYTHON = sys.implementation.name == "micropython"
+
+if not MICROPYTHON:
+    import tracemalloc
+
+RECORD_COUNTS = (10, 100, 1000, 5000)
+REPEATS = 5  # Best of this many runs is reported
+
+SKILL_POOL = (
+    "Python JavaScript TypeScript C C++ Rust Go Java Kotlin Swift SQL HTML CSS "
+    "React Vue Svelte Node.js Django Flask FastAPI Docker Kubernetes AWS Azure GCP "
+    "Linux Git MicroPython ESP32 Arduino MQTT GraphQL Redis PostgreSQL MongoDB "
+    "TensorFlow PyTorch Pandas Figma Bash"
+).split()
+
+
+def synthetic_project(i):
+    # Descriptions of one to four sentences, every third project without a URL
+    return {
+        "name": f"Project {i}",
+        "description": "Built and shipped a small tool for the team. " * (1 + i % 4),
+        "url": f"https://github.com/example/project-{i}" if i % 3 else "",
+    }
+
+
+def synthetic_portfolio(i, skill_count, project_count):
+    return {
+        "fullName": f"Developer {i}",
+        "title": ("Full Stack Developer", "Embedded Engineer", "Data Scientist")[i % 3],
+        "github": f"developer-{i}",
+        "linkedin": f"developer-{i}" if i % 2 else "",
+        "email": f"developer{i}@example.com",
+        "about": "I like building things that talk to each other. " * (1 + i % 3),
+        "skills": [SKILL_POOL[(i + s) % len(SKILL_POOL)] for s in range(skill_count)],
+        "projects": [synthetic_project(p) for p in range(project_count)],
+    }
+
+
+def synthetic_roster(count):
+    # count portfolios with 0-11 skills and 0-5 projects each
+    return [synthetic_portfolio(i, i % 12, i % 6) for i in range(count)]
+
+
+def joined(fragments):
+    # Renders the page into one string, as the buffered server does, and
+    # returns its size in bytes
+    return lambda: len("".join(fragments()).encode())
+
+
+def streamed(fragments):
+    # Encodes the page piece by piece, as the streaming server does
+    def render():
+        size = 0
+        for piece in fragments():
+            size += len(piece.encode())
+        return size
+
+    return render
+
+
+def joined_held(fragments):
+    # Everything joined() creates, kept alive so it can be counted. join()
+    # holds every fragment at once too, before it builds the page.
+    def render():
+        pieces = list(fragments())
+        page = "".join(pieces)
+        return pieces, page, page.encode()
+
+    return render
+
+
+def streamed_held(fragments):
+    # Everything streamed() creates, kept alive so it can be counted
+    def render():
+        pieces = list(fragments())
+        return pieces, [piece.encode() for piece in pieces]
+
+    return render
+
+
+def renderers(count):
+    # (name, render returning the page size, render holding what it created)
+    skill_names = {}
+    roster = synthetic_roster(count)
+    entries = [
+        (portfolio["github"], make_record(portfolio, skill_names))
+        for portfolio in roster
+    ]
+    del roster
+    big = synthetic_portfolio(count, min(count, len(SKILL_POOL)), count)
+    big_record = make_record(big, skill_names)
+    home = lambda: portfolio_web_server.iter_home_page(entries)
+    portfolio = lambda: portfolio_web_server.iter_portfolio_html(big_record)
+    # Built in one piece with += and one f-string, so it is its own fragment
+    simple = lambda: (simple_portfolio_server.generate_portfolio_html(big),)
+    return [
+        ("home joined", joined(home), joined_held(home)),
+        ("home streamed", streamed(home), streamed_held(home)),
+        ("portfolio joined", joined(portfolio), joined_held(portfolio)),
+        ("portfolio streamed", streamed(portfolio), streamed_held(portfolio)),
+        ("simple portfolio", joined(simple), joined_held(simple)),
+    ]
+
+
+def best_of(render):
+    best = None
+    for _ in range(REPEATS):
+        gc.collect()
+        started = time.ticks_us()
+        render()
+        elapsed = time.ticks_diff(time.ticks_us(), started)
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def micropython_heap(render):
+    # (None, bytes allocated, None): no block count or peak on MicroPython
+    gc.collect()
+    gc.disable()
+    before = gc.mem_alloc()
+    try:
+        render()
+        return None, gc.mem_alloc() - before, None
+    finally:
+        gc.enable()
+
+
+def traced_heap(render, held):
+    # (blocks allocated, bytes allocated, peak bytes above the start)
+    tracing = tracemalloc.is_tracing()  # HOST_TRACE_HEAP=1 may have started it
+    if not tracing:
+        tracemalloc.start()
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]  # The snapshots
+    gc.collect()
+    before = tracemalloc.take_snapshot().filter_traces(ignore)
+    kept = held()
+    after = tracemalloc.take_snapshot().filter_traces(ignore)
+    del kept
+    blocks = size = 0
+    for stat in after.compare_to(before, "filename"):
+        blocks += max(0, stat.count_diff)
+        size += max(0, stat.size_diff)
+    del before, after
+
+    gc.collect()
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    render()
+    peak = tracemalloc.get_traced_memory()[1] - start
+    if not tracing:
+        tracemalloc.stop()
+    return blocks, size, peak
+
+
+def column(value):
+    return "-" if value is None else value
+
+
+def main():
+    print(
+        "entries  renderer                    us    us/entry    allocs  alloc bytes"
+        "  peak bytes  page bytes"
+    )
+    for count in RECORD_COUNTS:
+        for name, render, held in renderers(count):
+            page_bytes = render()
+            elapsed = best_of(render)
+            if MICROPYTHON:
+                blocks, size, peak = micropython_heap(render)
+            else:
+                blocks, size, peak = traced_heap(render, held)
+            print(
+                f"{count:7d}  {name:18}  {elapsed:10d}  {elapsed / count:10.2f}"
+                f"  {column(blocks):>8}  {size:11d}  {column(peak):>10}"
+                f"  {page_bytes:10d}"
+            )
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main()
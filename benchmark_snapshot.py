@@ -0,0 +1,86 @@
+# Compares loading portfolio data from the binary snapshot against json.loads.
+# Runs on the ESP32 (mpremote run benchmark_snapshot.py, with portfolios.json
+# and portfolio_snapshot.py copied to the board) or on a computer with python3.
+import gc
+import os
+import json
+import time
+from portfolio_records import make_record
+from portfolio_snapshot import save_snapshot, load_snapshot
+
+try:
+    ticks_us = time.ticks_us
+    ticks_diff = time.ticks_diff
+except AttributeError:  # CPython
+    ticks_us = lambda: int(time.perf_counter() * 1000000)
+    ticks_diff = lambda end, start: end - start
+
+SOURCE_FILE = "portfolios.json"
+JSON_FILE = "benchmark.json"
+SNAPSHOT_FILE = "benchmark.snap"
+RECORD_COUNTS = (10, 100, 1000)
+REPEATS = 5  # Best of this many runs is reported
+
+
+def scaled_records(base, count):
+    # Copies of the sample records with unique usernames
+    records = []
+    for i in range(count):
+        record = dict(base[i % len(base)])
+        record["github"] = f"{record.get('github', 'user')}-{i}"
+        records.append(record)
+    return records
+
+
+def best_of(load):
+    best = None
+    for _ in range(REPEATS):
+        gc.collect()
+        started = ticks_us()
+        load()
+        elapsed = ticks_diff(ticks_us(), started)
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def file_size(path):
+    with open(path, "rb") as f:
+        return len(f.read())
+
+
+def load_json(path):
+    # Parsed into the same records the snapshot holds, as the server needs them
+    with open(path) as f:
+        skill_names = {}
+        return [make_record(record, skill_names) for record in json.loads(f.read())]
+
+
+def main():
+    with open(SOURCE_FILE) as f:
+        base = json.load(f)
+
+    print("records  json bytes  snap bytes   json us   snap us  speedup")
+    for count in RECORD_COUNTS:
+        records = scaled_records(base, count)
+        with open(JSON_FILE, "w") as f:
+            f.write(json.dumps(records))
+        skill_names = {}
+        compact = [make_record(record, skill_names) for record in records]
+        save_snapshot(SNAPSHOT_FILE, compact, {"etag": '"benchmark"'})
+        del records, compact
+        gc.collect()
+
+        json_us = best_of(lambda: load_json(JSON_FILE))
+        snap_us = best_of(lambda: load_snapshot(SNAPSHOT_FILE))
+        print(
+            f"{count:7d}  {file_size(JSON_FILE):10d}  {file_size(SNAPSHOT_FILE):10d}"
+            f"  {json_us:8d}  {snap_us:8d}  {json_us / snap_us:6.2f}x"
+        )
+
+    os.remove(JSON_FILE)
+    os.remove(SNAPSHOT_FILE)
+
+
+if __name__ == "__main__":
+    main()
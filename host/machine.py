@@ -0,0 +1,77 @@
+import os
+import time
+
+# Host stand-in for MicroPython's machine module. Pins keep their level in
+# memory and every change is appended to history, so a run can be checked
+# afterwards: [(seconds since start, pin id, value), ...]
+
+HISTORY_LIMIT = 10000  # Oldest changes are dropped past this many
+ECHO = os.environ.get("HOST_PIN_ECHO") == "1"  # Print every change as it happens
+
+history = []
+_started = time.monotonic()
+
+
+class Pin:
+    """A GPIO pin that records every level it is set to"""
+
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self.pull = pull
+        self._value = 0
+        if value is not None:
+            self.value(value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        self.__init__(self.id, mode, pull, value)
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        self._value = 1 if value else 0
+        history.append((time.monotonic() - _started, self.id, self._value))
+        if len(history) > HISTORY_LIMIT:
+            del history[0]
+        if ECHO:
+            print(f" [host] Pin({self.id}) = {self._value}")
+
+    def __call__(self, value=None):
+        return self.value(value)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def toggle(self):
+        self.value(1 - self._value)
+
+    def __repr__(self):
+        return f"Pin({self.id})"
+
+
+def changes(pin_id):
+    # The recorded (seconds, value) changes of one pin
+    return [(when, value) for when, id, value in history if id == pin_id]
+
+
+def freq(hz=None):
+    return 240000000 if hz is None else None
+
+
+def unique_id():
+    return b"\x00host\x00"
+
+
+def reset():
+    raise SystemExit("machine.reset()")
@@ -0,0 +1,96 @@
+import os
+import time
+
+# Host stand-in for MicroPython's network module. One simulated station:
+# connect() succeeds after HOST_WIFI_DELAY seconds, or never when
+# HOST_WIFI_FAIL=1, and scan() returns SCAN_RESULTS.
+
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 1000
+STAT_CONNECTING = 1001
+STAT_GOT_IP = 1010
+STAT_NO_AP_FOUND = 201
+STAT_WRONG_PASSWORD = 202
+
+CONNECT_DELAY = float(os.environ.get("HOST_WIFI_DELAY", "0.5"))
+CONNECT_FAILS = os.environ.get("HOST_WIFI_FAIL") == "1"
+RSSI = int(os.environ.get("HOST_WIFI_RSSI", "-55"))
+IFCONFIG = (
+    os.environ.get("HOST_WIFI_IP", "127.0.0.1"),
+    "255.255.255.0",
+    "192.168.1.1",
+    "8.8.8.8",
+)
+
+# (ssid, bssid, channel, RSSI, security, hidden), as the ESP32 port returns
+SCAN_RESULTS = [
+    (b"HomeNetwork", b"\x6c\xc8\x40\x89\xe2\xac", 6, -48, 3, 0),
+    (b"CoffeeShop", b"\x10\x22\x33\x44\x55\x66", 1, -71, 0, 0),
+    (b"Neighbour-5G", b"\xaa\xbb\xcc\xdd\xee\xff", 11, -83, 4, 0),
+]
+
+# Shared by every WLAN object, like the radio on a board
+_state = {"active": False, "ssid": None, "connect_at": None}
+
+
+class WLAN:
+    """A simulated Wi-Fi interface"""
+
+    def __init__(self, interface=STA_IF):
+        self.interface = interface
+
+    def active(self, active=None):
+        if active is None:
+            return _state["active"]
+        _state["active"] = bool(active)
+        return None
+
+    def connect(self, ssid=None, key=None):
+        _state["ssid"] = ssid
+        if CONNECT_FAILS:
+            _state["connect_at"] = None  # Never connects, like a wrong password
+        else:
+            _state["connect_at"] = time.monotonic() + CONNECT_DELAY
+
+    def disconnect(self):
+        _state["ssid"] = None
+        _state["connect_at"] = None
+
+    def isconnected(self):
+        connect_at = _state["connect_at"]
+        if not _state["active"] or connect_at is None:
+            return False
+        return time.monotonic() >= connect_at
+
+    def status(self, param=None):
+        if param == "rssi":
+            if not self.isconnected():
+                raise OSError("not connected")
+            return RSSI
+        if param is not None:
+            raise ValueError("unknown status param")
+        if self.isconnected():
+            return STAT_GOT_IP
+        if _state["ssid"] is None:
+            return STAT_IDLE
+        return STAT_NO_AP_FOUND if CONNECT_FAILS else STAT_CONNECTING
+
+    def ifconfig(self, config=None):
+        if config is None:
+            return IFCONFIG if self.isconnected() else ("0.0.0.0",) * 4
+        return None
+
+    def config(self, param):
+        if param in ("essid", "ssid"):
+            return _state["ssid"] or ""
+        if param == "mac":
+            return b"\x6c\xc8\x40\x00\x00\x01"
+        raise ValueError("unknown config param")
+
+    def scan(self):
+        if not _state["active"]:
+            raise OSError("Wifi Not Started")
+        time.sleep(min(CONNECT_DELAY, 2))  # A real scan takes a moment too
+        return list(SCAN_RESULTS)
@@ -0,0 +1,94 @@
+import gc
+import os
+import socket
+import time
+
+# Runs before any script when this directory is on PYTHONPATH, and adds the
+# MicroPython-only parts of built-in modules that the scripts use:
+# time.ticks_*, time.sleep_ms/us and gc.mem_free/mem_alloc.
+#
+# Servers bind port 80, which needs root on Linux, so binds to port 80 are
+# moved to HOST_HTTP_PORT (8080 unless set; 80 turns this off).
+#
+# gc.mem_alloc() counts resident memory gained since start-up, which costs one
+# read of /proc. HOST_TRACE_HEAP=1 traces the Python heap with tracemalloc
+# from start-up instead: exact, but every allocation gets slower.
+
+TICKS_PERIOD = 1 << 30  # MicroPython ticks wrap around at this value
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALF = TICKS_PERIOD // 2
+HEAP_BYTES = int(os.environ.get("HOST_HEAP_BYTES", str(110 * 1024)))  # Like an ESP32
+HTTP_PORT = int(os.environ.get("HOST_HTTP_PORT", "8080"))
+TRACE_HEAP = os.environ.get("HOST_TRACE_HEAP") == "1"
+
+
+def ticks_ms():
+    return int(time.monotonic() * 1000) & TICKS_MAX
+
+
+def ticks_us():
+    return int(time.monotonic() * 1000000) & TICKS_MAX
+
+
+def ticks_cpu():
+    return time.perf_counter_ns() & TICKS_MAX
+
+
+def ticks_diff(end, start):
+    # Signed difference that survives the wrap, like MicroPython's
+    return ((end - start + TICKS_HALF) & TICKS_MAX) - TICKS_HALF
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+def resident_bytes():
+    # Resident set size, or 0 where /proc is missing (macOS)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_BYTES
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def mem_alloc():
+    if TRACE_HEAP:
+        return tracemalloc.get_traced_memory()[0]
+    return max(0, resident_bytes() - STARTUP_RESIDENT_BYTES)
+
+
+def mem_free():
+    return max(0, HEAP_BYTES - mem_alloc())
+
+
+if not hasattr(time, "ticks_ms"):
+    time.ticks_ms = ticks_ms
+    time.ticks_us = ticks_us
+    time.ticks_cpu = ticks_cpu
+    time.ticks_diff = ticks_diff
+    time.ticks_add = ticks_add
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+    time.sleep_us = lambda us: time.sleep(us / 1000000)
+
+if TRACE_HEAP:
+    import tracemalloc
+
+    tracemalloc.start()  # Before the script runs, so its whole heap is counted
+PAGE_BYTES = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+STARTUP_RESIDENT_BYTES = resident_bytes()
+
+if not hasattr(gc, "mem_free"):
+    gc.mem_free = mem_free
+    gc.mem_alloc = mem_alloc
+
+if HTTP_PORT != 80:
+    _bind = socket.socket.bind
+
+    def bind(self, address):
+        if isinstance(address, tuple) and address[1] == 80:
+            print(f" [host] Port 80 is served on port {HTTP_PORT}")
+            address = (address[0], HTTP_PORT) + tuple(address[2:])
+        return _bind(self, address)
+
+    socket.socket.bind = bind
@@ -0,0 +1,103 @@
+import hashlib
+import io
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# Host stand-in for MicroPython's urequests. With HOST_URL_BASE set (for
+# example http://127.0.0.1:8000), requests go to that server with the same
+# path. Otherwise the last part of the URL path is read from the directory
+# HOST_URL_ROOT (the current directory by default), so the GitHub raw URL of
+# portfolios.json serves ./portfolios.json. HOST_URL_FILE serves one file
+# for every URL instead, for placeholder URLs such as the one in
+# simple_portfolio_server.py. Local files get an ETag from their content, so
+# conditional GETs are answered with 304.
+
+URL_BASE = os.environ.get("HOST_URL_BASE")
+URL_ROOT = os.environ.get("HOST_URL_ROOT", ".")
+URL_FILE = os.environ.get("HOST_URL_FILE")
+
+
+class Response:
+    """The parts of a urequests response the scripts use"""
+
+    def __init__(self, status_code, headers, raw, reason=b""):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.raw = raw  # File-like body, for reading in pieces
+        self._content = None
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = self.raw.read() if self.raw else b""
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode()
+
+    def json(self):
+        import json
+
+        return json.loads(self.content)
+
+    def close(self):
+        if self.raw:
+            self.raw.close()
+            self.raw = None
+
+
+def file_response(url, headers):
+    name = URL_FILE or os.path.basename(urllib.parse.urlparse(url).path)
+    path = os.path.join(URL_ROOT, name)
+    try:
+        with open(path, "rb") as f:
+            etag = '"' + hashlib.sha256(f.read()).hexdigest()[:16] + '"'
+    except OSError:
+        return Response(404, {}, io.BytesIO(b"404: Not Found"), b"Not Found")
+    if headers.get("If-None-Match") == etag:
+        return Response(304, {"ETag": etag}, io.BytesIO(b""), b"Not Modified")
+    response_headers = {"ETag": etag, "Content-Length": str(os.path.getsize(path))}
+    return Response(200, response_headers, open(path, "rb"), b"OK")
+
+
+def stub_response(method, url, headers, data):
+    parts = urllib.parse.urlparse(url)
+    target = URL_BASE.rstrip("/") + parts.path
+    if parts.query:
+        target += "?" + parts.query
+    request = urllib.request.Request(target, data=data, headers=headers, method=method)
+    try:
+        reply = urllib.request.urlopen(request, timeout=30)
+    except urllib.error.HTTPError as e:
+        reply = e  # 304s and errors still carry a status, headers and body
+    return Response(reply.status, dict(reply.headers), reply, reply.reason.encode())
+
+
+def request(method, url, data=None, json=None, headers=None, stream=None, timeout=None):
+    headers = dict(headers or {})
+    if json is not None:
+        import json as json_module
+
+        data = json_module.dumps(json).encode()
+        headers.setdefault("Content-Type", "application/json")
+    elif isinstance(data, str):
+        data = data.encode()
+    if URL_BASE:
+        return stub_response(method, url, headers, data)
+    return file_response(url, headers)
+
+
+def get(url, **kw):
+    return request("GET", url, **kw)
+
+
+def head(url, **kw):
+    return request("HEAD", url, **kw)
+
+
+def post(url, **kw):
+    return request("POST", url, **kw)
@@ -0,0 +1,518 @@
+import io
+import errno
+import select
+import socket
+
+try:
+    from asyncio import core as asyncio_core  # MicroPython's scheduler
+except ImportError:
+    asyncio_core = None  # CPython, or a port without asyncio
+
+try:
+    import deflate  # MicroPython
+except ImportError:
+    deflate = None
+    import zlib  # CPython
+
+MAX_REQUEST_BYTES = 2048  # Request heads must fit in this many bytes
+MAX_REQUEST_LINES = 32  # Request line plus header lines
+STREAM_BUFFER_BYTES = 1024  # Streamed bodies are sent in pieces of about this size
+SEND_TIMEOUT = 10  # Seconds a send waits for the client to accept more bytes
+SMALL_BODY_BYTES = 1024  # Bodies up to this size go out in one send with the head
+
+# Not every port names these; the values are the lwIP and Linux ones
+IPPROTO_TCP = getattr(socket, "IPPROTO_TCP", 6)
+TCP_NODELAY = getattr(socket, "TCP_NODELAY", 1)
+
+CONNECTION_CLOSE = b"Connection: close\r\n\r\n"
+CONNECTION_KEEP_ALIVE = b"Connection: keep-alive\r\n\r\n"
+
+
+# Request headers the servers look at, by name length; all others are skipped
+# without being decoded
+WANTED_HEADERS = {
+    4: b"host",
+    10: b"connection",
+    13: b"if-none-match",
+    14: b"content-length",
+    15: b"accept-encoding",
+    17: b"transfer-encoding",
+}
+
+LF, CR, COLON, SPACE, TAB = 10, 13, 58, 32, 9
+
+
+class RequestError(Exception):
+    """A request the server cannot parse; status is the response to send"""
+
+    def __init__(self, status):
+        super().__init__(status)
+        self.status = status
+
+
+class ResponseAborted(Exception):
+    """A streamed body failed after its head was sent; only closing is left"""
+
+
+class RequestReader:
+    """Reads and parses request heads from one connection into a reused buffer"""
+
+    # Bytes are received straight into a preallocated bytearray and the head
+    # is parsed in place: only the request line and the wanted header values
+    # become strings. Any bytes of a following request stay for the next call,
+    # and a request body is dropped as it arrives so it is never read as one.
+
+    def __init__(self, size=MAX_REQUEST_BYTES):
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.length = 0  # Bytes received
+        self.scanned = 0  # Bytes already searched for line ends
+        self.line_ends = [0] * MAX_REQUEST_LINES  # Offsets of each line's LF
+        self.lines = 0
+        self.body = 0  # Body bytes of the last request still to be dropped
+        self.conn = None
+        self.poller = None
+
+    def reset(self):
+        # Forgets any bytes from the previous connection
+        self.length = self.scanned = self.lines = self.body = 0
+        self.conn = self.poller = None
+
+    def skip_body(self):
+        # Drops what has arrived of the last request's body, returns how much
+        # of it is still to come
+        count = min(self.body, self.length)
+        if count:
+            self.discard(count)
+            self.body -= count
+        return self.body
+
+    def head_end(self):
+        # Offset just past the blank line that ends the head, or 0 if it has
+        # not all arrived yet. Line ends found on the way are recorded.
+        buffer = self.buffer
+        line_ends = self.line_ends
+        i = self.scanned
+        while i < self.length:
+            if buffer[i] == LF:
+                start = line_ends[self.lines - 1] + 1 if self.lines else 0
+                if i == start or (i == start + 1 and buffer[start] == CR):
+                    if self.lines:
+                        self.scanned = 0
+                        return i + 1
+                    # Blank lines before the request line are allowed, skip them
+                    self.discard(i + 1)
+                    i = 0
+                    continue
+                if self.lines == MAX_REQUEST_LINES:
+                    raise RequestError("431 Request Header Fields Too Large")
+                line_ends[self.lines] = i
+                self.lines += 1
+            i += 1
+        self.scanned = i
+        return 0
+
+    def discard(self, count):
+        # Drops the first count bytes, keeping any that follow
+        rest = self.length - count
+        if rest:
+            self.buffer[:rest] = bytes(self.view[count : self.length])
+        self.length = rest
+        self.scanned = 0
+        self.lines = 0
+
+    def parse(self, end):
+        # Returns (method, path, query, version, headers) for the head in
+        # buffer[:end]; header names in headers are lowercase
+        view = self.view
+        line_ends = self.line_ends
+        try:
+            request_line = str(view[: line_ends[0]], "utf-8").strip()
+        except UnicodeError:
+            raise RequestError("400 Bad Request")
+        parts = request_line.split(" ")
+        if len(parts) < 2 or len(parts) > 3:
+            raise RequestError("400 Bad Request")
+        method = parts[0].upper()
+        path, _, query = parts[1].partition("?")
+        version = parts[2] if len(parts) == 3 else "HTTP/1.0"
+
+        headers = {}
+        for line in range(1, self.lines):
+            header = self.header(line_ends[line - 1] + 1, line_ends[line])
+            if header:
+                headers[header[0]] = header[1]
+
+        # No handler reads a body, but its bytes must not be taken for the
+        # next request. A chunked body has no length to skip by.
+        if "transfer-encoding" in headers:
+            raise RequestError("411 Length Required")
+        try:
+            self.body = int(headers.get("content-length", 0))
+        except ValueError:
+            raise RequestError("400 Bad Request")
+        if self.body < 0:
+            raise RequestError("400 Bad Request")
+
+        self.discard(end)
+        return method, path, query, version, headers
+
+    def header(self, start, end):
+        # (name, value) if the line holds one of the wanted headers, else None
+        buffer = self.buffer
+        colon = start
+        while colon < end and buffer[colon] != COLON:
+            colon += 1
+        wanted = WANTED_HEADERS.get(colon - start)
+        if wanted is None:
+            return None
+        for i in range(len(wanted)):
+            if buffer[start + i] | 0x20 != wanted[i]:  # ASCII lowercase
+                return None
+
+        value_start = colon + 1
+        while value_start < end and buffer[value_start] in (SPACE, TAB):
+            value_start += 1
+        while end > value_start and buffer[end - 1] in (CR, SPACE, TAB):
+            end -= 1
+        try:
+            value = str(self.view[value_start:end], "utf-8")
+        except UnicodeError:
+            raise RequestError("400 Bad Request")
+        return wanted.decode(), value
+
+    def full(self):
+        if self.length == len(self.buffer):
+            if not self.lines:
+                raise RequestError("414 URI Too Long")
+            raise RequestError("431 Request Header Fields Too Large")
+
+    def recv(self, conn, timeout):
+        # Next request on a socket, or None once the client has closed it.
+        # Raises OSError(ETIMEDOUT) after timeout seconds without a request.
+        if conn is not self.conn:
+            self.reset()
+            self.conn = conn
+            self.poller = select.poll()
+            self.poller.register(conn, select.POLLIN)
+
+        # Non-blocking reads return what has arrived; a blocking readinto would
+        # wait until the whole buffer was full
+        conn.setblocking(False)
+        try:
+            while True:
+                end = 0 if self.skip_body() else self.head_end()
+                if end:
+                    return self.parse(end)
+                self.full()
+                if not self.poller.poll(int(timeout * 1000)):
+                    raise OSError(errno.ETIMEDOUT)
+                count = recv_into(conn, self.view[self.length :])
+                if count == 0:
+                    return None  # Client closed the connection
+                if count:
+                    self.length += count
+        finally:
+            conn.settimeout(timeout)
+
+    async def read(self, stream):
+        # Next request on an asyncio stream, or None once the client has closed it
+        while True:
+            end = 0 if self.skip_body() else self.head_end()
+            if end:
+                return self.parse(end)
+            self.full()
+            space = self.view[self.length :]
+            if hasattr(stream, "readinto"):
+                count = await stream.readinto(space)
+            else:
+                data = await stream.read(len(space))  # CPython streams lack readinto
+                count = len(data)
+                space[:count] = data
+            if not count:
+                return None  # Client closed the connection
+            self.length += count
+
+
+def recv_into(conn, buffer):
+    # Reads what a non-blocking socket has waiting: a byte count, 0 at the end
+    # of the stream, or None if nothing has arrived yet
+    try:
+        if hasattr(conn, "recv_into"):
+            return conn.recv_into(buffer)  # CPython
+        return conn.readinto(buffer)  # MicroPython
+    except OSError as e:
+        if e.args[0] == errno.EAGAIN:
+            return None
+        raise
+
+
+def url_decode(text):
+    # Undoes %XX escapes and + for space, as browsers encode form fields
+    text = text.replace("+", " ")
+    if "%" not in text:
+        return text
+    parts = text.split("%")
+    decoded = bytearray(parts[0].encode())
+    for part in parts[1:]:
+        try:
+            decoded.append(int(part[:2], 16))
+            decoded += part[2:].encode()
+        except ValueError:
+            decoded += ("%" + part).encode()  # Not an escape, keep it as sent
+    try:
+        return bytes(decoded).decode()
+    except UnicodeError:
+        return text
+
+
+URL_SAFE = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-._~"
+
+
+def url_encode(text):
+    encoded = ""
+    for char in text:
+        if char in URL_SAFE:
+            encoded += char
+        else:
+            for byte in char.encode():
+                encoded += "%%%02X" % byte
+    return encoded
+
+
+def parse_query(query):
+    # "a=1&b=x+y" -> {"a": "1", "b": "x y"}; a repeated name keeps its last value
+    params = {}
+    for pair in query.split("&"):
+        if pair:
+            name, _, value = pair.partition("=")
+            params[url_decode(name)] = url_decode(value)
+    return params
+
+
+def wants_keep_alive(version, headers):
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.1":
+        return connection != "close"  # HTTP/1.1 connections persist by default
+    return connection == "keep-alive"
+
+
+def response_head(
+    status, content_length, content_type="text/html; charset=utf-8", headers=""
+):
+    # Everything but the Connection header, which depends on the request.
+    # A content_length of None announces a chunked body instead, and headers
+    # holds any extra CRLF-terminated header lines.
+    if content_length is None:
+        framing = "Transfer-Encoding: chunked"
+    else:
+        framing = f"Content-Length: {content_length}"
+    return (
+        f"HTTP/1.1 {status}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"{framing}\r\n"
+        f"{headers}"
+    ).encode()
+
+
+def html_response(status, html, headers=""):
+    body = html.encode()
+    return response_head(status, len(body), headers=headers), body
+
+
+def error_response(status):
+    return html_response(status, f"<html><body><h1>{status}</h1></body></html>")
+
+
+def gzip_compress(data):
+    if deflate:
+        stream = io.BytesIO()
+        with deflate.DeflateIO(stream, deflate.GZIP) as compressor:
+            compressor.write(data)
+        return stream.getvalue()
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)  # wbits 31 writes gzip
+    return compressor.compress(data) + compressor.flush()
+
+
+def accepts_gzip(accept_encoding):
+    if not accept_encoding:
+        return False
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() != "gzip":
+            continue
+        quality = params.strip().partition("q=")[2]
+        try:
+            return not quality or float(quality) > 0  # q=0 means "not acceptable"
+        except ValueError:
+            return False
+    return False
+
+
+def gzip_etag(etag):
+    # The compressed bytes are a different representation, so they get their own tag
+    return etag[:-1] + '-gz"'
+
+
+def gzip_response(status, body, headers="", content_type="text/html; charset=utf-8"):
+    # Returns (head, body) for a gzip copy of body, or None if it would not be smaller
+    compressed = gzip_compress(body)
+    if len(compressed) >= len(body):
+        return None
+    headers += "Content-Encoding: gzip\r\n"
+    return response_head(status, len(compressed), content_type, headers), compressed
+
+
+def not_modified_head(etag, headers=""):
+    # A 304 carries the validator but no body and no Content-Length
+    return f"HTTP/1.1 304 Not Modified\r\nETag: {etag}\r\n{headers}".encode()
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]  # If-None-Match uses the weak comparison
+        if candidate == etag:
+            return True
+    return False
+
+
+def encoded_length(fragments):
+    # Byte length of a streamed body, found without holding the whole body
+    return sum(len(fragment.encode()) for fragment in fragments)
+
+
+def iter_body(fragments, chunked=False, buffer_size=STREAM_BUFFER_BYTES):
+    # Groups small string fragments into send-sized byte pieces
+    buffer = bytearray()
+    for fragment in fragments:
+        buffer += fragment.encode()
+        if len(buffer) >= buffer_size:
+            yield chunk_frame(buffer) if chunked else buffer
+            buffer = bytearray()
+    if buffer:
+        yield chunk_frame(buffer) if chunked else buffer
+    # Last chunk marks the end of the body. A fragment that raises never gets
+    # here, so the client sees a cut-off body rather than a complete one.
+    if chunked:
+        yield b"0\r\n\r\n"
+
+
+def chunk_frame(data):
+    frame = bytearray(f"{len(data):x}\r\n".encode())
+    frame += data
+    frame += b"\r\n"
+    return frame
+
+
+def set_no_delay(sock):
+    # Sends small writes at once. Without it a body sent after its head waits
+    # for the client's delayed ACK, about 40 ms per keep-alive request.
+    try:
+        sock.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+    except (OSError, AttributeError):
+        pass  # The port cannot turn Nagle off, small bodies still go with the head
+
+
+def send_some(conn, view):
+    # Sends what the socket takes now: a byte count, or None if it is full
+    try:
+        return conn.send(view)
+    except OSError as e:
+        if e.args[0] == errno.EAGAIN:
+            return None
+        raise
+
+
+def send_all(conn, data):
+    # Sends data through memoryview slices, so a partial send resumes where it
+    # stopped without copying the rest. A full non-blocking socket is polled
+    # until it drains. Returns the number of bytes sent.
+    view = memoryview(data)
+    sent = 0
+    poller = None
+    while sent < len(view):
+        count = send_some(conn, view[sent:])
+        if count is not None:
+            sent += count
+            continue
+        if poller is None:
+            poller = select.poll()
+            poller.register(conn, select.POLLOUT)
+        if not poller.poll(SEND_TIMEOUT * 1000):
+            raise OSError(errno.ETIMEDOUT)
+    return sent
+
+
+def wait_writable(sock):
+    # Parks the task until sock can take more bytes, as Stream.drain() does.
+    # A generator rather than a coroutine, so it compiles on CPython too.
+    yield asyncio_core._io_queue.queue_write(sock)
+
+
+async def write_all(writer, data):
+    sock = getattr(writer, "s", None)  # MicroPython streams expose their socket
+    if sock is None or asyncio_core is None:
+        # CPython's transport sends what it can at once and buffers only the rest
+        writer.write(data)
+        await writer.drain()
+        return len(data)
+    # Writing the socket directly skips the copy Stream.write makes into its
+    # output buffer; a full socket parks the task until it is writable again
+    view = memoryview(data)
+    sent = 0
+    while sent < len(view):
+        count = send_some(sock, view[sent:])
+        if count is None:
+            await wait_writable(sock)
+        else:
+            sent += count
+    return sent
+
+
+def send_response(conn, head, body, keep_alive=False, head_only=False):
+    # body is either bytes or an iterator of byte pieces from iter_body. A
+    # small body goes out in one send with the head; larger ones are sent as
+    # they are, never joined to the head or copied. Returns the bytes sent.
+    head = head + (CONNECTION_KEEP_ALIVE if keep_alive else CONNECTION_CLOSE)
+    if head_only:
+        return send_all(conn, head)
+    if isinstance(body, bytes) and len(body) <= SMALL_BODY_BYTES:
+        return send_all(conn, head + body)
+    sent = send_all(conn, head)
+    if isinstance(body, bytes):
+        return sent + send_all(conn, body)
+    body = iter(body)
+    while True:
+        try:
+            piece = next(body)
+        except StopIteration:
+            return sent
+        except Exception as e:
+            raise ResponseAborted(e)  # The head is out, a 500 cannot follow it
+        sent += send_all(conn, piece)
+
+
+async def write_response(writer, head, body, keep_alive=False, head_only=False):
+    head = head + (CONNECTION_KEEP_ALIVE if keep_alive else CONNECTION_CLOSE)
+    if head_only:
+        return await write_all(writer, head)
+    if isinstance(body, bytes) and len(body) <= SMALL_BODY_BYTES:
+        return await write_all(writer, head + body)
+    sent = await write_all(writer, head)
+    if isinstance(body, bytes):
+        return sent + await write_all(writer, body)
+    body = iter(body)
+    while True:
+        try:
+            piece = next(body)
+        except StopIteration:
+            return sent
+        except Exception as e:
+            raise ResponseAborted(e)  # The head is out, a 500 cannot follow it
+        sent += await write_all(writer, piece)  # One piece at a time, memory stays flat
@@ -0,0 +1,84 @@
+import json
+
+STREAM_CHUNK_BYTES = 512  # Bytes read from the response at a time
+MAX_RECORD_BYTES = 16 * 1024  # Larger records are rejected rather than buffered
+
+WHITESPACE = tuple(b" \t\r\n")  # As byte values
+OPEN_BRACE, CLOSE_BRACE = ord("{"), ord("}")
+OPEN_BRACKET, CLOSE_BRACKET = ord("["), ord("]")
+QUOTE, COMMA = ord('"'), ord(",")
+
+
+class JsonArrayStream:
+    """Parses a top-level JSON array of objects one object at a time"""
+
+    # Only the text of the object being read is buffered, so peak memory
+    # follows the largest object rather than the whole document
+
+    def __init__(self, stream, chunk_size=STREAM_CHUNK_BYTES):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+
+    def __iter__(self):
+        started = False  # Seen the opening [
+        depth = 0  # Nesting level inside the current object
+        in_string = False
+        skip = 0  # Bytes still to skip after a backslash at the end of a chunk
+        record = bytearray()
+
+        while True:
+            chunk = self.stream.read(self.chunk_size)
+            if not chunk:
+                raise ValueError("JSON array ended early")
+            self.bytes_read += len(chunk)
+
+            pos = skip
+            skip = 0
+            start = 0  # Where the current object begins in this chunk
+            end = len(chunk)
+            while pos < end:
+                if in_string:
+                    # Jump to the next quote or escape instead of walking the string
+                    quote = chunk.find(b'"', pos)
+                    escape = chunk.find(b"\\", pos, quote if quote >= 0 else end)
+                    if escape >= 0:
+                        pos = escape + 2  # The escaped character cannot end the string
+                        if pos > end:
+                            skip = pos - end
+                    elif quote >= 0:
+                        in_string = False
+                        pos = quote + 1
+                    else:
+                        pos = end
+                    continue
+
+                byte = chunk[pos]
+                if depth:
+                    if byte == QUOTE:
+                        in_string = True
+                    elif byte == OPEN_BRACE or byte == OPEN_BRACKET:
+                        depth += 1
+                    elif byte == CLOSE_BRACE or byte == CLOSE_BRACKET:
+                        depth -= 1
+                        if not depth:
+                            record += chunk[start : pos + 1]
+                            yield json.loads(record)
+                            record = bytearray()
+                elif byte == OPEN_BRACE and started:
+                    depth = 1
+                    start = pos
+                elif byte == OPEN_BRACKET and not started:
+                    started = True
+                elif byte == CLOSE_BRACKET and started:
+                    return
+                elif byte != COMMA or not started:
+                    if byte not in WHITESPACE:
+                        raise ValueError("expected a JSON array of objects")
+                pos += 1
+
+            if depth:
+                # The object carries on into the next chunk
+                record += chunk[start:]
+                if len(record) > MAX_RECORD_BYTES:
+                    raise ValueError("JSON record too large")
@@ -0,0 +1,47 @@
+# Portfolios are held as fixed-layout tuples instead of the dicts json.loads
+# returns: no hash table or key strings per record, and every record that
+# lists a skill shares one copy of its name. Missing fields are None.
+
+STRING_FIELDS = ("fullName", "title", "github", "linkedin", "email", "about")
+PROJECT_FIELDS = ("name", "description", "url")
+
+# Positions in a portfolio record
+FULL_NAME, TITLE, GITHUB, LINKEDIN, EMAIL, ABOUT, SKILLS, PROJECTS = range(8)
+
+# Positions in a project
+PROJECT_NAME, PROJECT_DESCRIPTION, PROJECT_URL = range(3)
+
+
+def intern_skill(skill_names, skill):
+    # skill_names maps every skill name seen so far to its shared copy
+    skill = str(skill)
+    return skill_names.setdefault(skill, skill)
+
+
+def make_record(portfolio, skill_names):
+    # Converts one parsed JSON object, keeping only what the renderers use
+    values = [portfolio.get(field) for field in STRING_FIELDS]
+    skills = portfolio.get("skills") or ()
+    values.append(tuple(intern_skill(skill_names, skill) for skill in skills))
+    values.append(
+        tuple(
+            tuple(project.get(field) for field in PROJECT_FIELDS)
+            for project in portfolio.get("projects") or ()
+        )
+    )
+    return tuple(values)
+
+
+def record_dict(record):
+    # The record in its portfolios.json shape again, without the missing fields
+    portfolio = {}
+    for field, value in zip(STRING_FIELDS, record):
+        if value is not None:
+            portfolio[field] = value
+    portfolio["skills"] = list(record[SKILLS])
+    projects = []
+    for project in record[PROJECTS]:
+        fields = zip(PROJECT_FIELDS, project)
+        projects.append({field: value for field, value in fields if value is not None})
+    portfolio["projects"] = projects
+    return portfolio
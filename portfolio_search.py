@@ -0,0 +1,84 @@
+from portfolio_records import FULL_NAME, TITLE, SKILLS
+
+# Indexes built once per data load, so requests only visit what they match.
+#
+# Word-prefix search over names, titles and usernames: every distinct word
+# maps to the positions of the entries that contain it, and a sorted word
+# list finds all words starting with a prefix by binary search.
+#
+# Skills: every skill maps to the positions of the entries that list it.
+
+SEARCH_SEPARATORS = "|,.;:!?()[]/&+"  # Split words apart like spaces
+
+
+def search_words(text):
+    text = text.lower()
+    for separator in SEARCH_SEPARATORS:
+        text = text.replace(separator, " ")
+    return text.split()
+
+
+def build_search_index(entries):
+    # Returns (words, postings): sorted distinct words, and word -> positions
+    postings = {}
+    for position, (username, portfolio) in enumerate(entries):
+        text = f"{portfolio[FULL_NAME] or ''} {portfolio[TITLE] or ''} {username}"
+        for word in search_words(text):
+            positions = postings.get(word)
+            if positions is None:
+                postings[word] = [position]
+            elif positions[-1] != position:
+                positions.append(position)  # Word repeated within one entry
+    return sorted(postings), postings
+
+
+def first_at_least(words, prefix):
+    # Index of the first word >= prefix (MicroPython has no bisect module)
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high) // 2
+        if words[middle] < prefix:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def search_entries(words, postings, query):
+    # Positions of the entries where every query word starts one of their
+    # words, in entry order
+    matches = None
+    for term in search_words(query):
+        positions = set()
+        i = first_at_least(words, term)
+        while i < len(words) and words[i].startswith(term):
+            positions.update(postings[words[i]])
+            i += 1
+        matches = positions if matches is None else matches & positions
+        if not matches:
+            return []
+    return sorted(matches) if matches else []
+
+
+def skill_key(name):
+    # Case and spacing are ignored, so "MicroPython" and "micropython " match
+    return " ".join(str(name).lower().split())
+
+
+def build_skill_index(entries):
+    # Returns (skills, names): skill key -> entry positions, and skill key ->
+    # the spelling it was first listed with, for display
+    skills = {}
+    names = {}
+    for position, (_, portfolio) in enumerate(entries):
+        for skill in portfolio[SKILLS]:
+            key = skill_key(skill)
+            if not key:
+                continue
+            positions = skills.get(key)
+            if positions is None:
+                skills[key] = [position]
+                names[key] = skill
+            elif positions[-1] != position:
+                positions.append(position)  # Skill listed twice by one entry
+    return skills, names
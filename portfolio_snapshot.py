@@ -0,0 +1,187 @@
+import os
+import json
+import struct
+from portfolio_records import (
+    STRING_FIELDS,
+    PROJECT_FIELDS,
+    SKILLS,
+    PROJECTS,
+)
+from server_log import log
+
+# Compact on-flash copy of the portfolio data, much quicker to load than JSON.
+#
+# File layout (little endian):
+#   b"PFS2"
+#   u32 each: record count, project count, skill count, skill name count,
+#   validators length, strings length
+#   validators as JSON
+#   u8 per record: bit i set if STRING_FIELDS[i] is present
+#   u16 per record: skill count, then u16 per record: project count
+#   u16 per skill: index into the skill names
+#   u8 per project: bit i set if PROJECT_FIELDS[i] is present
+#   the skill names, then every other string of every record in order, UTF-8,
+#   separated by NUL bytes
+#
+# Loading is a handful of C-level calls (unpack the tables, decode and split
+# the strings) plus a short loop per record, instead of JSON's per-character
+# parsing. Each skill name is stored and decoded once, and every record that
+# has it shares the one string. Records are the tuples described in
+# portfolio_records.
+
+MAGIC = b"PFS2"
+HEADER = "<6I"
+HEADER_SIZE = struct.calcsize(HEADER)
+SEPARATOR = "\0"
+MAX_COUNT = 0xFFFF  # Per record counts and skill indexes are u16
+
+ALL_STRING_FIELDS = (1 << len(STRING_FIELDS)) - 1
+ALL_PROJECT_FIELDS = (1 << len(PROJECT_FIELDS)) - 1
+
+
+def _present(values, strings):
+    # Appends the values that are not None to strings, returns their presence bits
+    flags = 0
+    for i, value in enumerate(values):
+        if value is not None:
+            flags |= 1 << i
+            strings.append(str(value).replace(SEPARATOR, ""))
+    return flags
+
+
+def save_snapshot(path, records, validators):
+    # Raises ValueError for a roster too big for the u16 tables
+    record_flags = bytearray()
+    counts = []  # Skill counts of every record, then project counts
+    project_counts = []
+    skill_indexes = []
+    skill_names = {}  # Name -> index, in the order first seen
+    project_flags = bytearray()
+    strings = []
+
+    field_count = len(STRING_FIELDS)
+    for record in records:
+        record_flags.append(_present(record[:field_count], strings))
+        counts.append(len(record[SKILLS]))
+        for skill in record[SKILLS]:
+            skill_indexes.append(skill_names.setdefault(skill, len(skill_names)))
+        project_counts.append(len(record[PROJECTS]))
+        for project in record[PROJECTS]:
+            project_flags.append(_present(project, strings))
+    counts.extend(project_counts)
+
+    if (counts and max(counts) > MAX_COUNT) or len(skill_names) > MAX_COUNT + 1:
+        raise ValueError("too many skills or projects for a snapshot")
+
+    count = len(records)
+    meta = json.dumps(validators).encode()
+    names = [name.replace(SEPARATOR, "") for name in skill_names]
+    blob = SEPARATOR.join(names + strings).encode()
+    header = (count, len(project_flags), len(skill_indexes), len(names))
+    header += (len(meta), len(blob))
+
+    # Written to a temporary file and renamed, so a reset mid-write cannot
+    # leave a half-written snapshot behind
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack(HEADER, *header))
+        f.write(meta)
+        f.write(record_flags)
+        f.write(struct.pack(f"<{len(counts)}H", *counts))
+        f.write(struct.pack(f"<{len(skill_indexes)}H", *skill_indexes))
+        f.write(project_flags)
+        f.write(blob)
+
+    try:
+        os.remove(path)  # MicroPython's rename does not replace an existing file
+    except OSError:
+        pass
+    os.rename(temp_path, path)
+
+
+def _values(count, flags, strings, pos):
+    # Returns (values, next position), with None where a presence bit is clear
+    values = []
+    for i in range(count):
+        if flags & (1 << i):
+            values.append(strings[pos])
+            pos += 1
+        else:
+            values.append(None)
+    return values, pos
+
+
+def parse_snapshot(data):
+    # Returns (records, validators) from the bytes of a snapshot file
+    if data[:4] != MAGIC:
+        raise ValueError("not a portfolio snapshot")
+    header = struct.unpack_from(HEADER, data, len(MAGIC))
+    count, project_total, skill_total, name_count, meta_length, blob_length = header
+    offset = len(MAGIC) + HEADER_SIZE
+    validators = json.loads(data[offset : offset + meta_length])
+    offset += meta_length
+
+    record_flags = data[offset : offset + count]
+    offset += count
+    # Skill counts then project counts, in one call
+    counts = struct.unpack_from(f"<{2 * count}H", data, offset)
+    offset += 4 * count
+    skill_indexes = struct.unpack_from(f"<{skill_total}H", data, offset)
+    offset += 2 * skill_total
+    project_flags = data[offset : offset + project_total]
+    offset += project_total
+
+    blob = data[offset : offset + blob_length]
+    if len(blob) != blob_length:
+        raise ValueError("truncated snapshot")
+    strings = blob.decode().split(SEPARATOR)
+    names = strings[:name_count]
+
+    field_count = len(STRING_FIELDS)
+    project_field_count = len(PROJECT_FIELDS)
+    pos = name_count
+    skill_index = 0
+    project_index = 0
+    records = []
+    for i in range(count):
+        if record_flags[i] == ALL_STRING_FIELDS:
+            end = pos + field_count
+            values = strings[pos:end]
+            pos = end
+        else:
+            values, pos = _values(field_count, record_flags[i], strings, pos)
+
+        end = skill_index + counts[i]
+        values.append(tuple([names[j] for j in skill_indexes[skill_index:end]]))
+        skill_index = end
+
+        projects = []
+        for _ in range(counts[count + i]):
+            flags = project_flags[project_index]
+            project_index += 1
+            if flags == ALL_PROJECT_FIELDS:
+                end = pos + project_field_count
+                project = strings[pos:end]
+                pos = end
+            else:
+                project, pos = _values(project_field_count, flags, strings, pos)
+            projects.append(tuple(project))
+        values.append(tuple(projects))
+
+        records.append(tuple(values))
+    return records, validators
+
+
+def load_snapshot(path):
+    # Returns (records, validators), or None if there is no usable snapshot
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None  # No snapshot saved yet
+    try:
+        return parse_snapshot(data)
+    except Exception as e:
+        log.warning(" Ignoring unreadable snapshot %s: %s", path, e)
+        return None
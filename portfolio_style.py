@@ -0,0 +1,368 @@
+import hashlib
+import binascii
+from http_utils import (
+    response_head,
+    gzip_response,
+    gzip_etag,
+    accepts_gzip,
+    etag_matches,
+    not_modified_head,
+)
+
+# One stylesheet shared by the home page and the portfolio pages.
+# Page specific rules are scoped with the body class (.home or .portfolio).
+STYLESHEET = """* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+}
+
+body {
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+    line-height: 1.6;
+    color: #333;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    min-height: 100vh;
+}
+
+.container {
+    margin: 0 auto;
+}
+
+h1 {
+    margin-bottom: 10px;
+    font-size: 2.5em;
+}
+
+.footer {
+    text-align: center;
+    color: white;
+    padding: 20px;
+    font-size: 0.9em;
+}
+
+.esp32-badge {
+    background: rgba(255,255,255,0.2);
+    color: white;
+    padding: 5px 15px;
+    border-radius: 15px;
+    display: inline-block;
+    margin-top: 10px;
+}
+
+/* Home page */
+
+body.home {
+    padding: 20px;
+}
+
+.home .container {
+    max-width: 1000px;
+}
+
+.home header {
+    text-align: center;
+    color: white;
+    margin-bottom: 50px;
+}
+
+.subtitle {
+    font-size: 1.1em;
+    opacity: 0.9;
+}
+
+.home header a {
+    color: white;
+}
+
+.search {
+    margin-top: 20px;
+}
+
+.search input {
+    width: 100%;
+    max-width: 400px;
+    padding: 10px 20px;
+    border: none;
+    border-radius: 25px;
+    font-size: 1em;
+}
+
+.no-results {
+    grid-column: 1 / -1;
+    text-align: center;
+    color: white;
+}
+
+.pager {
+    display: flex;
+    justify-content: center;
+    align-items: center;
+    gap: 20px;
+    color: white;
+    margin-bottom: 40px;
+}
+
+.pager a {
+    color: white;
+    font-weight: 600;
+    text-decoration: none;
+}
+
+.users-grid {
+    display: grid;
+    grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
+    gap: 20px;
+    margin-bottom: 40px;
+}
+
+.user-card {
+    background: white;
+    border-radius: 15px;
+    padding: 30px;
+    text-align: center;
+    box-shadow: 0 10px 30px rgba(0,0,0,0.2);
+    transition: transform 0.3s, box-shadow 0.3s;
+}
+
+.user-card:hover {
+    transform: translateY(-10px);
+    box-shadow: 0 15px 40px rgba(0,0,0,0.3);
+}
+
+.user-pic {
+    width: 100px;
+    height: 100px;
+    border-radius: 50%;
+    background: linear-gradient(135deg, #667eea, #764ba2);
+    margin: 0 auto 15px;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    font-size: 40px;
+    color: white;
+}
+
+.user-card h3 {
+    color: #333;
+    margin-bottom: 8px;
+    font-size: 1.3em;
+}
+
+.user-card p {
+    color: #666;
+    margin-bottom: 20px;
+    font-size: 0.95em;
+}
+
+.view-btn {
+    display: inline-block;
+    padding: 10px 20px;
+    background: linear-gradient(135deg, #667eea, #764ba2);
+    color: white;
+    text-decoration: none;
+    border-radius: 25px;
+    transition: transform 0.3s;
+    font-weight: 600;
+}
+
+.view-btn:hover {
+    transform: scale(1.05);
+}
+
+/* Portfolio page */
+
+.portfolio .container {
+    max-width: 800px;
+    padding: 20px;
+}
+
+.back-link {
+    display: inline-block;
+    color: white;
+    text-decoration: none;
+    margin-bottom: 20px;
+    font-weight: 600;
+    transition: transform 0.3s;
+}
+
+.back-link:hover {
+    transform: translateX(-5px);
+}
+
+.portfolio header {
+    background: white;
+    border-radius: 20px;
+    padding: 40px;
+    text-align: center;
+    margin-bottom: 30px;
+    box-shadow: 0 10px 30px rgba(0,0,0,0.1);
+}
+
+.profile-pic {
+    width: 120px;
+    height: 120px;
+    border-radius: 50%;
+    background: linear-gradient(135deg, #667eea, #764ba2);
+    margin: 0 auto 20px;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    font-size: 48px;
+    color: white;
+}
+
+.portfolio h1 {
+    color: #333;
+}
+
+.title {
+    color: #666;
+    font-size: 1.2em;
+    margin-bottom: 20px;
+}
+
+.social-links {
+    display: flex;
+    justify-content: center;
+    gap: 20px;
+    margin-bottom: 20px;
+    flex-wrap: wrap;
+}
+
+.social-links a {
+    padding: 10px 20px;
+    background: #667eea;
+    color: white;
+    text-decoration: none;
+    border-radius: 25px;
+    transition: transform 0.3s;
+}
+
+.social-links a:hover {
+    transform: translateY(-2px);
+}
+
+.section {
+    background: white;
+    border-radius: 15px;
+    padding: 30px;
+    margin-bottom: 20px;
+    box-shadow: 0 5px 15px rgba(0,0,0,0.1);
+}
+
+h2 {
+    color: #667eea;
+    margin-bottom: 15px;
+    font-size: 1.8em;
+}
+
+.about {
+    font-size: 1.1em;
+    color: #555;
+    line-height: 1.8;
+}
+
+.skills {
+    display: flex;
+    flex-wrap: wrap;
+    gap: 10px;
+    margin-top: 15px;
+}
+
+.skill {
+    background: linear-gradient(135deg, #667eea, #764ba2);
+    color: white;
+    padding: 8px 16px;
+    border-radius: 20px;
+    font-size: 0.9em;
+    text-decoration: none;
+}
+
+.project {
+    border-left: 4px solid #667eea;
+    padding-left: 20px;
+    margin-bottom: 20px;
+}
+
+.project h3 {
+    color: #333;
+    margin-bottom: 8px;
+}
+
+.project p {
+    color: #666;
+    margin-bottom: 10px;
+}
+
+.project a {
+    color: #667eea;
+    text-decoration: none;
+    font-weight: 600;
+}
+
+.project a:hover {
+    text-decoration: underline;
+}
+
+@media (max-width: 600px) {
+    h1 { font-size: 1.8em; }
+    .users-grid { grid-template-columns: 1fr; }
+    .social-links { flex-direction: column; }
+    .portfolio .container { padding: 10px; }
+}
+"""
+
+STYLESHEET_BYTES = STYLESHEET.encode()
+
+# Content hash: the ETag, and the ?v= query that busts browser caches on change
+STYLESHEET_VERSION = binascii.hexlify(
+    hashlib.sha256(STYLESHEET_BYTES).digest()[:6]
+).decode()
+
+STYLESHEET_PATH = "/static/style.css"
+STYLESHEET_URL = f"{STYLESHEET_PATH}?v={STYLESHEET_VERSION}"
+STYLESHEET_LINK = f'<link rel="stylesheet" href="{STYLESHEET_URL}">'
+
+STYLESHEET_ETAG = f'"{STYLESHEET_VERSION}"'
+
+# The URL changes whenever the content does, so browsers may keep it for a year
+STYLESHEET_HEADERS = (
+    "Cache-Control: public, max-age=31536000, immutable\r\n"
+    + "Vary: Accept-Encoding\r\n"
+)
+
+STYLESHEET_RESPONSE = (
+    response_head(
+        "200 OK",
+        len(STYLESHEET_BYTES),
+        "text/css; charset=utf-8",
+        f"{STYLESHEET_HEADERS}ETag: {STYLESHEET_ETAG}\r\n",
+    ),
+    STYLESHEET_BYTES,
+)
+
+# Compressed once at import; None if the firmware cannot compress
+try:
+    STYLESHEET_GZIP_RESPONSE = gzip_response(
+        "200 OK",
+        STYLESHEET_BYTES,
+        f"{STYLESHEET_HEADERS}ETag: {gzip_etag(STYLESHEET_ETAG)}\r\n",
+        "text/css; charset=utf-8",
+    )
+except Exception:
+    STYLESHEET_GZIP_RESPONSE = None
+
+
+def stylesheet_response(request):
+    # Route handler for STYLESHEET_PATH: a 304 if the browser's copy is current,
+    # otherwise the stored gzip or plain bytes
+    headers = request[4]
+    use_gzip = STYLESHEET_GZIP_RESPONSE and accepts_gzip(headers.get("accept-encoding"))
+    if_none_match = headers.get("if-none-match")
+    if etag_matches(if_none_match, STYLESHEET_ETAG) or etag_matches(
+        if_none_match, gzip_etag(STYLESHEET_ETAG)
+    ):
+        etag = gzip_etag(STYLESHEET_ETAG) if use_gzip else STYLESHEET_ETAG
+        return not_modified_head(etag, STYLESHEET_HEADERS), b""
+    return STYLESHEET_GZIP_RESPONSE if use_gzip else STYLESHEET_RESPONSE
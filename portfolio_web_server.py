@@ -1,10 +1,62 @@
-import socket
-import network
 import time
-import gc
+import json
+import hashlib
+import binascii
+import struct
 from machine import Pin
 import urequests
 
+try:
+    import _thread
+except ImportError:
+    _thread = None
+from response_cache import ResponseCache
+from portfolio_records import (
+    FULL_NAME,
+    TITLE,
+    GITHUB,
+    LINKEDIN,
+    EMAIL,
+    ABOUT,
+    SKILLS,
+    PROJECTS,
+    PROJECT_NAME,
+    PROJECT_DESCRIPTION,
+    PROJECT_URL,
+    make_record,
+    record_dict,
+)
+from portfolio_snapshot import save_snapshot, load_snapshot
+from portfolio_search import (
+    build_search_index,
+    search_entries,
+    skill_key,
+    build_skill_index,
+)
+from json_stream import JsonArrayStream
+from portfolio_style import (
+    STYLESHEET_LINK,
+    STYLESHEET_PATH,
+    STYLESHEET_VERSION,
+    stylesheet_response,
+)
+from http_utils import (
+    url_decode,
+    url_encode,
+    response_head,
+    not_modified_head,
+    etag_matches,
+    accepts_gzip,
+    gzip_etag,
+    gzip_response,
+    encoded_length,
+    iter_body,
+)
+from server_core import Router, Server, connect_wifi, run
+from server_metrics import ServerMetrics, METRICS_CONTENT_TYPE, metric
+from stage_timing import StageTimer, CORE_STAGES, TIMING_PATH, timing_route
+from server_log import log, INFO
+
 led = Pin(2, Pin.OUT)  # On-board LED for status indication
 
 WIFI_SSID = "YOUR_WIFI_NAME"  # TODO: Replace with your WiFi SSID
@@ -18,215 +70,346 @@ GITHUB_FILEPATH = (
 
 GITHUB_URL = f"https://raw.githubusercontent.com/{GITHUB_USERNAME}/{GITHUB_REPO}/main/{GITHUB_FILEPATH}"
 
-portfolio_cache = None
-last_fetch_time = 0
 CACHE_DURATION = 300  # Cache duration in seconds (5 minutes)
+last_fetch_attempt = 0
+
+# Last good download and its HTTP validators in one binary snapshot on flash.
+# The server boots from it without waiting for Wi-Fi and TLS, and the next
+# fetch can be a conditional GET that GitHub answers with a bodyless 304.
+SNAPSHOT_FILE = "portfolios.snap"
+
+REFRESH_INTERVAL = CACHE_DURATION  # Seconds between background refreshes
+REFRESH_RETRY_INTERVAL = 60  # Seconds before retrying after a failed refresh
+REFRESH_CHECK_INTERVAL = 5  # How often the refresher wakes up to check
+REFRESH_STACK_BYTES = 16 * 1024  # TLS needs more stack than the thread default
+background_refresh = False  # True once the refresher thread is running
+
+TEMPLATE_VERSION = "3"  # Bump when the page markup changes, so browsers refetch
+# Browsers revalidate with the ETag, and caches keep gzip and plain copies apart
+PAGE_HEADERS = "Cache-Control: no-cache\r\nVary: Accept-Encoding\r\n"
+
+GZIP_RESPONSES = True  # Keep a gzip copy of each cached page for clients that accept it
+
+RESPONSE_CACHE_BYTES = 48 * 1024  # Heap budget for rendered pages, tune to free RAM
+# /api bodies get their own budget, so rendering pages cannot evict them
+API_CACHE_BYTES = 12 * 1024
+
+HOME_PAGE_SIZE = 24  # Cards per home page, later ones are on /?page=2 and so on
+MAX_SEARCH_LENGTH = 64  # Longer /?q= searches are cut off here
+SKILLS_PATH = "/skills"  # All skills here, everyone with one skill below it
+
+# Read-only JSON for scripts and dashboards: the roster at API_ROSTER_PATH and
+# one record per user at /api/<username>
+API_PATH = "/api"
+API_ROSTER_PATH = API_PATH + "/portfolios"
+API_PAGE_SIZE = 100  # Roster entries per /api/portfolios?page=N
+API_HEADERS = PAGE_HEADERS + "Access-Control-Allow-Origin: *\r\n"
+JSON_CONTENT_TYPE = "application/json"
+METRICS_PATH = "/metrics"  # Prometheus text for scrapers, never cached
+HTML_CONTENT_TYPE = "text/html; charset=utf-8"
+
+USE_ASYNC_SERVER = True  # False runs the blocking one-connection-at-a-time server
+
+# "buffered" renders whole pages and caches them, "chunked" and "counted" stream
+# pages piece by piece (chunked encoding or a measured Content-Length) so peak
+# memory stays flat however many portfolios there are, at the cost of caching
+RENDER_MODE = "buffered"
+
+KEEP_ALIVE = False  # True lets browsers reuse one connection for several requests
+# Without USE_ASYNC_SERVER, nobody else is answered while a kept-alive visitor
+# idles, for up to KEEP_ALIVE_TIMEOUT seconds
+KEEP_ALIVE_TIMEOUT = 5  # Seconds a connection may sit idle before it is closed
+KEEP_ALIVE_MAX_REQUESTS = 20  # Requests served per connection before closing it
+
+LOG_LEVEL = INFO  # DEBUG also logs every request, at some cost per request
+LOG_FILE = None  # A path like "server.log" keeps a rotating copy on flash
+
+# True times each stage of every request, see TIMING_PATH or stop_server()
+STAGE_TIMING = False
+RENDER, ENCODE, COMPRESS = range(len(CORE_STAGES), len(CORE_STAGES) + 3)
+stage_timer = (
+    StageTimer(CORE_STAGES + ("render", "encode", "gzip")) if STAGE_TIMING else None
+)
 
 
-def connect_wifi():
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-    if wlan.isconnected():
-        ip = wlan.ifconfig()[0]
-        print(f" Connected to WiFi. IP: {ip}")
-        return ip
+def build_portfolio_index(portfolios):
+    index = {}
+    entries = []
+    for position, portfolio in enumerate(portfolios):
+        username = portfolio[GITHUB] or ""
+        if not isinstance(username, str) or not username:
+            log.warning(" Portfolio #%d has no GitHub username, skipping it.", position)
+            continue
+
+        username = username.lower()
+        if username in index:
+            log.warning(
+                " Duplicate GitHub username '%s' at #%d, keeping the first.",
+                username,
+                position,
+            )
+            continue
+
+        index[username] = portfolio
+        entries.append((username, portfolio))
+    return index, entries
+
+
+def page_hasher():
+    # Every page ETag covers the markup and stylesheet versions
+    hasher = hashlib.sha256(TEMPLATE_VERSION.encode())
+    hasher.update(STYLESHEET_VERSION.encode())
+    return hasher
+
+
+def hasher_etag(hasher):
+    return '"' + binascii.hexlify(hasher.digest()[:8]).decode() + '"'
+
+
+def build_page_etags(entries):
+    # ETags depend only on the records behind each page, so a refresh that
+    # leaves a record unchanged keeps its ETag and browsers keep their copy
+    etags = {}
+    home_hasher = page_hasher()
+    skills_hasher = page_hasher()
+    roster_hasher = page_hasher()
+    for username, portfolio in entries:
+        hasher = page_hasher()
+        hasher.update(json.dumps(portfolio).encode())
+        etags["/" + username] = hasher_etag(hasher)
+
+        card = (username, portfolio[FULL_NAME], portfolio[TITLE])
+        home_hasher.update(json.dumps(card).encode())
+        skills_hasher.update(json.dumps((card, portfolio[SKILLS])).encode())
+        # The roster shows the username as portfolios.json spells it
+        roster_hasher.update(json.dumps((card, portfolio[GITHUB])).encode())
+    etags["/"] = hasher_etag(home_hasher)
+    etags[SKILLS_PATH] = hasher_etag(skills_hasher)
+    etags[API_ROSTER_PATH] = hasher_etag(roster_hasher)
+    return etags
+
+
+class PortfolioSnapshot:
+    # Everything derived from one download. A refresh builds a new snapshot
+    # and swaps it in with one assignment, so a request never sees a mix.
+    def __init__(self, portfolios, fetched_at, previous=None, validators=None):
+        self.portfolios = portfolios
+        self.fetched_at = fetched_at
+        # ETag / Last-Modified of the download, plus its size and fetch time
+        self.validators = validators or {}
+        # index maps username -> record, entries keeps file order for the home page
+        self.index, self.entries = build_portfolio_index(portfolios)
+        # Sorted words and word -> entry positions, for /?q= searches
+        self.search_words, self.search_postings = build_search_index(self.entries)
+        # Skill key -> entry positions and skill key -> display name, for /skills
+        self.skills, self.skill_names = build_skill_index(self.entries)
+        self.etags = build_page_etags(self.entries)  # Page path -> ETag
+        # Pages rendered from this data
+        self.cache = ResponseCache(RESPONSE_CACHE_BYTES)
+        # /api bodies, serialised on first request and kept apart from the pages
+        self.api = ResponseCache(API_CACHE_BYTES)
+
+        if previous:
+            # Bodies whose ETag did not change serialise the same, keep them
+            self.api.carry_over(
+                previous.api,
+                lambda key: page_etag(self, key) is not None
+                and page_etag(self, key) == page_etag(previous, key),
+            )
+            # Pages whose ETag did not change render the same, keep them
+            self.cache.carry_over(
+                previous.cache,
+                lambda key: page_etag(self, key) is not None
+                and page_etag(self, key) == page_etag(previous, key),
+            )
+
+
+def header_value(headers, name):
+    # Response header names keep the server's capitalisation
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
 
-    print(f" Connecting to WiFi {WIFI_SSID}...")
-    wlan.connect(WIFI_SSID, WIFI_PASSWORD)
 
-    for _ in range(10):
-        if wlan.isconnected():
-            ip = wlan.ifconfig()[0]
-            print(f" Connected to WiFi. IP: {ip}")
-            return ip
-        time.sleep(1)
-        print(" Attempting to connect...")
+def save_cached_data(portfolios_data, validators):
+    # Data and validators share one file, so they can never disagree
+    try:
+        save_snapshot(SNAPSHOT_FILE, portfolios_data, validators)
+    except (OSError, ValueError, struct.error) as e:
+        log.warning(" Could not save portfolio data to flash: %s", e)
+
+
+def restore_cached_data():
+    # Boots with the last good download, so a 304 from GitHub is enough to start
+    global snapshot
+    started = time.ticks_ms()
+    restored = load_snapshot(SNAPSHOT_FILE)
+    if restored is None:
+        return False  # Nothing saved yet, or an unreadable file
+
+    portfolios_data, validators = restored
+    # fetched_at 0 marks the data as stale, so it is revalidated right away
+    snapshot = PortfolioSnapshot(portfolios_data, 0, snapshot, validators)
+    log.info(
+        " Restored %d portfolios from flash in %d ms.",
+        len(portfolios_data),
+        time.ticks_diff(time.ticks_ms(), started),
+    )
+    return True
+
+
+def conditional_headers(validators):
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def fetch_portfolios_data(force=False):
+    global snapshot, last_fetch_attempt
+    current_time = time.time()
+    if (
+        not force
+        and snapshot.portfolios
+        and (current_time - snapshot.fetched_at < CACHE_DURATION)
+    ):
+        log.debug(" Using cached portfolio data.")
+        return snapshot.portfolios
+
+    log.info(" Fetching portfolio data from GitHub...")
+    log.info(" URL: %s", GITHUB_URL)
+    last_fetch_attempt = current_time
+
+    # Only ask for a 304 when there is data to keep using
+    request_headers = {}
+    if snapshot.portfolios:
+        request_headers = conditional_headers(snapshot.validators)
+
+    started = time.ticks_ms()
+    try:
+        response = urequests.get(GITHUB_URL, headers=request_headers)
+        try:
+            status = response.status_code
+            portfolios_data = None
+            if status == 200:
+                # Parsed one record at a time as the body arrives, so the raw
+                # body and the whole parse tree are never in memory together
+                records = JsonArrayStream(response.raw)
+                skill_names = {}  # Shared by all records, so each skill is stored once
+                portfolios_data = [make_record(r, skill_names) for r in records]
+                size = records.bytes_read
+                validators = {
+                    "etag": header_value(response.headers, "ETag"),
+                    "last_modified": header_value(response.headers, "Last-Modified"),
+                }
+            elif status != 304:
+                log.warning(" Failed to fetch data. Status code: %d", status)
+        finally:
+            response.close()  # Frees the socket even if the body is not valid JSON
+
+        if status == 304:
+            # Nothing changed: no body was sent and nothing needs parsing
+            elapsed = time.ticks_diff(time.ticks_ms(), started)
+            saved_ms = snapshot.validators.get("fetch_ms", elapsed) - elapsed
+            snapshot.fetched_at = current_time
+            log.info(
+                " Portfolio data not modified (304) in %d ms, saved %d bytes and %d ms.",
+                elapsed,
+                snapshot.validators.get("size", 0),
+                saved_ms,
+            )
+            return snapshot.portfolios
+
+        if portfolios_data is not None:
+            # Build everything first, then swap: requests use the old data until now
+            snapshot = PortfolioSnapshot(
+                portfolios_data, current_time, snapshot, validators
+            )
+            validators["size"] = size
+            validators["fetch_ms"] = time.ticks_diff(time.ticks_ms(), started)
+            log.info(
+                " Portfolio data fetched successfully: %d bytes in %d ms.",
+                size,
+                validators["fetch_ms"],
+            )
+            save_cached_data(portfolios_data, validators)
+            return portfolios_data
+    except Exception as e:
+        log.warning(" Exception occurred while fetching data: %s", e)
 
-    print(" Failed to connect to WiFi.")
-    return None
+    # Keep serving the last good data until GitHub answers again
+    if snapshot.portfolios:
+        log.info(" Keeping the previous portfolio data.")
+    return snapshot.portfolios
 
 
-def fetch_portfolios_data():
-    global portfolio_cache, last_fetch_time
-    current_time = time.time()
-    if portfolio_cache and (current_time - last_fetch_time < CACHE_DURATION):
-        print(" Using cached portfolio data.")
-        return portfolio_cache
+def refresh_due():
+    now = time.time()
+    return (
+        now - snapshot.fetched_at >= REFRESH_INTERVAL
+        and now - last_fetch_attempt >= REFRESH_RETRY_INTERVAL
+    )
 
-    print(" Fetching portfolio data from GitHub...")
-    print(f" URL: {GITHUB_URL}")
 
-    try:
-        response = urequests.get(GITHUB_URL)
-        if response.status_code == 200:
-            portfolios_data = response.json()
-            response.close()
-
-            if isinstance(portfolios_data, list):
-                portfolio_cache = portfolios_data
-                last_fetch_time = current_time
-                print(" Portfolio data fetched successfully.")
-                return portfolios_data
-        else:
-            print(f" Failed to fetch data. Status code: {response.status_code}")
-            response.close()
-            return []
-    except Exception as e:
-        print(f" Exception occurred while fetching data: {e}")
-        return []
+def refresh_loop():
+    # Runs in its own thread, so visitors never wait for the TLS fetch
+    while background_refresh:
+        time.sleep(REFRESH_CHECK_INTERVAL)
+        if refresh_due():
+            fetch_portfolios_data(force=True)  # The main thread writes its log out
 
 
-def generate_home_page(portfolios):
-    user_cards = ""
-    for portfolio in portfolios:
-        github_username = portfolio.get("github", "").lower()
-        full_name = portfolio.get("fullName", "Unknown")
-        title = portfolio.get("title", "N/A")
+def start_background_refresh():
+    global background_refresh
+    if _thread is None:
+        return False
+    try:
+        _thread.stack_size(REFRESH_STACK_BYTES)
+    except (AttributeError, ValueError):
+        pass  # Keep the port's default stack size
+    background_refresh = True
+    _thread.start_new_thread(refresh_loop, ())
+    log.info(" Background refresh started.")
+    return True
 
-        user_cards += f"""<div class="user-card">
-            <div class="user-pic">{full_name[0]}</div>
-            <h3>{full_name}</h3>
-            <p>{title}</p>
-            <a href="/{github_username}" class="view-btn">View Portfolio →</a>
-        </div>"""
 
-    html = f"""<!DOCTYPE html>
+HOME_PAGE_START = f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>ESP-32 Portfolio Web Server</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 20px;
-        }}
-
-        .container {{
-            max-width: 1000px;
-            margin: 0 auto;
-        }}
-
-        header {{
-            text-align: center;
-            color: white;
-            margin-bottom: 50px;
-        }}
-
-        h1 {{
-            font-size: 2.5em;
-            margin-bottom: 10px;
-        }}
-
-        .subtitle {{
-            font-size: 1.1em;
-            opacity: 0.9;
-        }}
-
-        .users-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-            gap: 20px;
-            margin-bottom: 40px;
-        }}
-
-        .user-card {{
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            text-align: center;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-            transition: transform 0.3s, box-shadow 0.3s;
-        }}
-
-        .user-card:hover {{
-            transform: translateY(-10px);
-            box-shadow: 0 15px 40px rgba(0,0,0,0.3);
-        }}
-
-        .user-pic {{
-            width: 100px;
-            height: 100px;
-            border-radius: 50%;
-            background: linear-gradient(135deg, #667eea, #764ba2);
-            margin: 0 auto 15px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 40px;
-            color: white;
-        }}
-
-        .user-card h3 {{
-            color: #333;
-            margin-bottom: 8px;
-            font-size: 1.3em;
-        }}
-
-        .user-card p {{
-            color: #666;
-            margin-bottom: 20px;
-            font-size: 0.95em;
-        }}
-
-        .view-btn {{
-            display: inline-block;
-            padding: 10px 20px;
-            background: linear-gradient(135deg, #667eea, #764ba2);
-            color: white;
-            text-decoration: none;
-            border-radius: 25px;
-            transition: transform 0.3s;
-            font-weight: 600;
-        }}
-
-        .view-btn:hover {{
-            transform: scale(1.05);
-        }}
-
-        .footer {{
-            text-align: center;
-            color: white;
-            padding: 20px;
-            font-size: 0.9em;
-        }}
-
-        .esp32-badge {{
-            background: rgba(255,255,255,0.2);
-            color: white;
-            padding: 5px 15px;
-            border-radius: 15px;
-            display: inline-block;
-            margin-top: 10px;
-        }}
-
-        @media (max-width: 600px) {{
-            h1 {{ font-size: 1.8em; }}
-            .users-grid {{ grid-template-columns: 1fr; }}
-        }}
-    </style>
+    {STYLESHEET_LINK}
 </head>
-<body>
+<body class="home">
     <div class="container">
-        <header>
+"""
+
+HOME_HEADER_START = """        <header>
             <h1>🌟 Portfolios</h1>
             <p class="subtitle">Click on any user card to view their portfolio</p>
+            <form class="search" action="/" method="get">
+                <input type="search" name="q" placeholder="Search names, titles, usernames" value=\""""
+
+HOME_HEADER_END = f"""">
+            </form>
+            <p class="subtitle"><a href="{SKILLS_PATH}">Browse by skill</a></p>
         </header>
 
-        <div class="users-grid">
-            {user_cards}
+"""
+
+USERS_GRID_START = """        <div class="users-grid">
+            """
+
+HOME_PAGE_GRID_END = """
         </div>
+"""
 
+HOME_PAGE_END = """
         <div class="footer">
             <div>Powered by ESP32 + MicroPython</div>
             <div class="esp32-badge">🚀 Running on IoT Hardware</div>
@@ -235,35 +418,161 @@ def generate_home_page(portfolios):
 </body>
 </html>"""
 
-    return html
 
+def render_user_card(github_username, portfolio):
+    full_name = portfolio[FULL_NAME] or "Unknown"
+    title = portfolio[TITLE] or "N/A"
 
-def generate_portfolio_html(portfolio_data):
-    full_name = portfolio_data.get("fullName", "Portfolio")
-    title = portfolio_data.get("title", "Developer")
-    github = portfolio_data.get("github", "")
-    linkedin = portfolio_data.get("linkedin", "")
-    email = portfolio_data.get("email", "")
-    about = portfolio_data.get("about", "Welcome to my portfolio")
-    skills = portfolio_data.get("skills", [])
-    projects = portfolio_data.get("projects", [])
-
-    skills_html = "".join([f'<span class="skill">{skill}</span>' for skill in skills])
-
-    projects_html = ""
-    for project in projects:
-        project_url = project.get("url", "")
-        url_link = (
-            f'<a href="{project_url}" target="_blank">View Project →</a>'
-            if project_url
-            else ""
+    return f"""<div class="user-card">
+            <div class="user-pic">{full_name[0]}</div>
+            <h3>{full_name}</h3>
+            <p>{title}</p>
+            <a href="/{github_username}" class="view-btn">View Portfolio →</a>
+        </div>"""
+
+
+def escape_html(text):
+    # For text that comes from the request rather than from portfolios.json
+    return (
+        text.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace('"', "&quot;")
+    )
+
+
+def home_url(search, page):
+    params = []
+    if search:
+        params.append("q=" + url_encode(search))
+    if page > 1:
+        params.append(f"page={page}")
+    return "/?" + "&".join(params) if params else "/"
+
+
+def skill_url(key, page=1):
+    url = f"{SKILLS_PATH}/{url_encode(key)}"
+    return f"{url}?page={page}" if page > 1 else url
+
+
+def render_pager(page, page_count, page_url):
+    # page_url(n) is the address of page n
+    if page_count <= 1:
+        return ""
+    links = []
+    if page > 1:
+        links.append(f'<a href="{page_url(page - 1)}">← Previous</a>')
+    links.append(f"<span>Page {page} of {page_count}</span>")
+    if page < page_count:
+        links.append(f'<a href="{page_url(page + 1)}">Next →</a>')
+    return f"""
+        <nav class="pager">{"".join(links)}</nav>
+"""
+
+
+def iter_card_page(header, entries, pager="", empty=""):
+    # Yields the page piece by piece, so only one card is in memory at a time.
+    # entries are the cards of this page only, pager links the other pages.
+    yield HOME_PAGE_START
+    yield header
+    yield USERS_GRID_START
+    for github_username, portfolio in entries:
+        yield render_user_card(github_username, portfolio)
+    if empty and not entries:
+        yield f'<p class="no-results">{empty}</p>'
+    yield HOME_PAGE_GRID_END
+    yield pager
+    yield HOME_PAGE_END
+
+
+def iter_home_page(entries, search="", pager=""):
+    header = HOME_HEADER_START + escape_html(search) + HOME_HEADER_END
+    empty = f'No portfolios match "{escape_html(search)}".' if search else ""
+    return iter_card_page(header, entries, pager, empty)
+
+
+def render_skill_header(heading, subtitle):
+    return f"""        <header>
+            <h1>{heading}</h1>
+            <p class="subtitle">{subtitle}</p>
+        </header>
+
+"""
+
+
+def iter_skills_page(data):
+    # Every skill with the number of portfolios listing it, most common first
+    skills = data.skills
+    yield HOME_PAGE_START
+    yield render_skill_header(
+        "🛠️ Skills",
+        f"{len(skills)} skills across {len(data.entries)} portfolios · "
+        '<a href="/">All portfolios</a>',
+    )
+    yield """        <div class="section">
+            <div class="skills">"""
+    for key in sorted(skills, key=lambda key: (-len(skills[key]), key)):
+        yield (
+            f'<a class="skill" href="{skill_url(key)}">'
+            f"{data.skill_names[key]} ({len(skills[key])})</a>"
         )
-        projects_html += f"""<div class="project">
-            <h3>{project.get("name", "Project")}</h3>
-            <p>{project.get("description", "")}</p>
+    yield "</div>\n        </div>\n"
+    yield HOME_PAGE_END
+
+
+def generate_home_page(entries, search="", pager=""):
+    return "".join(iter_home_page(entries, search, pager))
+
+
+PORTFOLIO_PAGE_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>"""
+
+PORTFOLIO_PAGE_HEAD_END = f""" - Portfolio</title>
+    {STYLESHEET_LINK}
+</head>
+<body class="portfolio">
+    <div class="container">
+"""
+
+PORTFOLIO_PAGE_END = """
+        <div class="footer">
+            <div>Powered by ESP32 + MicroPython</div>
+            <div class="esp32-badge">🚀 Running on IoT Hardware</div>
+        </div>
+    </div>
+</body>
+</html>"""
+
+
+def render_project(project):
+    project_url = project[PROJECT_URL]
+    url_link = (
+        f'<a href="{project_url}" target="_blank">View Project →</a>'
+        if project_url
+        else ""
+    )
+    return f"""<div class="project">
+            <h3>{project[PROJECT_NAME] or "Project"}</h3>
+            <p>{project[PROJECT_DESCRIPTION] or ""}</p>
             {url_link}
         </div>"""
 
+
+def iter_portfolio_html(portfolio_data):
+    # Yields the page piece by piece, so only one project is in memory at a time
+    full_name = portfolio_data[FULL_NAME] or "Portfolio"
+    title = portfolio_data[TITLE] or "Developer"
+    github = portfolio_data[GITHUB]
+    linkedin = portfolio_data[LINKEDIN]
+    email = portfolio_data[EMAIL]
+    about = portfolio_data[ABOUT] or "Welcome to my portfolio"
+    skills = portfolio_data[SKILLS]
+    projects = portfolio_data[PROJECTS]
+
     social_links = ""
     if github:
         social_links += (
@@ -278,202 +587,10 @@ def generate_portfolio_html(portfolio_data):
 
     back_link = '<a href="/" class="back-link">← Back to All Portfolios</a>'
 
-    skills_section = ""
-    if skills:
-        skills_section = f"""<div class="section">
-            <h2>Skills</h2>
-            <div class="skills">{skills_html}</div>
-        </div>"""
-
-    projects_section = ""
-    if projects:
-        projects_section = f"""<div class="section">
-            <h2>Projects</h2>
-            {projects_html}
-        </div>"""
-
-    html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{full_name} - Portfolio</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-        }}
-
-        .container {{
-            max-width: 800px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-
-        .back-link {{
-            display: inline-block;
-            color: white;
-            text-decoration: none;
-            margin-bottom: 20px;
-            font-weight: 600;
-            transition: transform 0.3s;
-        }}
-
-        .back-link:hover {{
-            transform: translateX(-5px);
-        }}
-
-        header {{
-            background: white;
-            border-radius: 20px;
-            padding: 40px;
-            text-align: center;
-            margin-bottom: 30px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-        }}
-
-        .profile-pic {{
-            width: 120px;
-            height: 120px;
-            border-radius: 50%;
-            background: linear-gradient(135deg, #667eea, #764ba2);
-            margin: 0 auto 20px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 48px;
-            color: white;
-        }}
-
-        h1 {{
-            color: #333;
-            margin-bottom: 10px;
-            font-size: 2.5em;
-        }}
-
-        .title {{
-            color: #666;
-            font-size: 1.2em;
-            margin-bottom: 20px;
-        }}
-
-        .social-links {{
-            display: flex;
-            justify-content: center;
-            gap: 20px;
-            margin-bottom: 20px;
-            flex-wrap: wrap;
-        }}
-
-        .social-links a {{
-            padding: 10px 20px;
-            background: #667eea;
-            color: white;
-            text-decoration: none;
-            border-radius: 25px;
-            transition: transform 0.3s;
-        }}
-
-        .social-links a:hover {{
-            transform: translateY(-2px);
-        }}
-
-        .section {{
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            margin-bottom: 20px;
-            box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-        }}
-
-        h2 {{
-            color: #667eea;
-            margin-bottom: 15px;
-            font-size: 1.8em;
-        }}
-
-        .about {{
-            font-size: 1.1em;
-            color: #555;
-            line-height: 1.8;
-        }}
-
-        .skills {{
-            display: flex;
-            flex-wrap: wrap;
-            gap: 10px;
-            margin-top: 15px;
-        }}
-
-        .skill {{
-            background: linear-gradient(135deg, #667eea, #764ba2);
-            color: white;
-            padding: 8px 16px;
-            border-radius: 20px;
-            font-size: 0.9em;
-        }}
-
-        .project {{
-            border-left: 4px solid #667eea;
-            padding-left: 20px;
-            margin-bottom: 20px;
-        }}
-
-        .project h3 {{
-            color: #333;
-            margin-bottom: 8px;
-        }}
-
-        .project p {{
-            color: #666;
-            margin-bottom: 10px;
-        }}
-
-        .project a {{
-            color: #667eea;
-            text-decoration: none;
-            font-weight: 600;
-        }}
-
-        .project a:hover {{
-            text-decoration: underline;
-        }}
-
-        .footer {{
-            text-align: center;
-            color: white;
-            padding: 20px;
-            font-size: 0.9em;
-        }}
-
-        .esp32-badge {{
-            background: rgba(255,255,255,0.2);
-            color: white;
-            padding: 5px 15px;
-            border-radius: 15px;
-            display: inline-block;
-            margin-top: 10px;
-        }}
-
-        @media (max-width: 600px) {{
-            h1 {{ font-size: 1.8em; }}
-            .social-links {{ flex-direction: column; }}
-            .container {{ padding: 10px; }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        {back_link}
+    yield PORTFOLIO_PAGE_HEAD
+    yield full_name
+    yield PORTFOLIO_PAGE_HEAD_END
+    yield f"""        {back_link}
 
         <header>
             <div class="profile-pic">{full_name[0]}</div>
@@ -488,113 +605,471 @@ def generate_portfolio_html(portfolio_data):
             <h2>About Me</h2>
             <div class="about">{about}</div>
         </div>
+"""
 
-        {skills_section}
+    if skills:
+        yield """
+        <div class="section">
+            <h2>Skills</h2>
+            <div class="skills">"""
+        for skill in skills:
+            yield f'<a class="skill" href="{skill_url(skill_key(skill))}">{skill}</a>'
+        yield "</div>\n        </div>\n"
 
-        {projects_section}
+    if projects:
+        yield """
+        <div class="section">
+            <h2>Projects</h2>
+            """
+        for project in projects:
+            yield render_project(project)
+        yield "\n        </div>\n"
 
-        <div class="footer">
-            <div>Powered by ESP32 + MicroPython</div>
-            <div class="esp32-badge">🚀 Running on IoT Hardware</div>
-        </div>
-    </div>
-</body>
-</html>"""
+    yield PORTFOLIO_PAGE_END
 
-    return html
+
+def generate_portfolio_html(portfolio_data):
+    return "".join(iter_portfolio_html(portfolio_data))
 
 
-def parse_request_path(request):
+def query_page(query):
     try:
-        lines = request.split("\r\n")
-        if lines:
-            parts = lines[0].split(" ")
-            if len(parts) >= 2:
-                path = parts[1].lower()
-                return path
-    except Exception as e:
-        print(f" Error parsing request path: {e}")
-    return "/"
+        return max(1, int(query.get("page", "1")))
+    except ValueError:
+        return 1
 
 
-def find_portfolio(portfolios, github_username):
-    for portfolio in portfolios:
-        if portfolio.get("github", "").lower() == github_username.lower():
-            return portfolio
-    return None
+def home_params(query):
+    # Returns (search, page) from the query of a home page request, normalised
+    # so that requests showing the same page share one cache entry and ETag
+    search = " ".join(query.get("q", "")[:MAX_SEARCH_LENGTH].lower().split())
+    return search, query_page(query)
 
 
-def start_portfolio_server():
-    ip = connect_wifi()
-    if not ip:
-        print("Could not connect to WiFi. Exiting...")
-        return
+def path_skill(path):
+    # "/skills/ux%20design" -> "ux design"; a + in a path is a plus, not a space
+    return skill_key(url_decode(path[len(SKILLS_PATH) + 1 :].replace("+", "%2B")))
 
-    portfolios_data = fetch_portfolios_data()
 
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind(("0.0.0.0", 80))
-    s.listen(5)
+def is_api_path(path):
+    return path.startswith(API_PATH + "/")
 
-    print("=" * 50)
-    print(f"\n Local server running on http://{ip}:80")
-    print(f" Loaded {len(portfolios_data) if portfolios_data else 0} portfolios.")
-    print(" Press Ctrl+C to stop the server.\n")
-    print("=" * 50)
 
-    try:
-        while True:
-            conn, addr = s.accept()
-            print(f" Connection from {addr}")
-            led.on()
-            time.sleep(1)
-
-            try:
-                request = conn.recv(1024).decode()
-
-                path = parse_request_path(request)
-                print(f" Requested path: {path}")
-
-                if path == "/" or path == "":
-                    print(" Generating home page...")
-                    html_content = generate_home_page(portfolios_data)
-                    print(" Serving home page with all portfolios.")
-                else:
-                    username = path.lstrip("/")
-                    portfolio = find_portfolio(portfolios_data, username)
-
-                    if portfolio:
-                        html_content = generate_portfolio_html(portfolio)
-                        print(f" Serving portfolio for user: {username}")
-                    else:
-                        html_content = (
-                            "<html><body><h1>404 Not Found</h1>"
-                            "<p>The requested portfolio does not exist.</p></body></html>"
-                        )
-                        print(f" Portfolio for user '{username}' not found.")
-
-                http_response = (
-                    "HTTP/1.1 200 OK\nContent-Type: text/html\nConnection: close\n\n"
-                )
-                http_response += html_content
-                conn.send(http_response.encode())
-            except Exception as e:
-                print(f" Error processing request: {e}")
-                error_response = "HTTP/1.1 500 Internal Server Error\nContent-Type: text/html\nConnection: close\n\n"
-                error_response += (
-                    "<html><body><h1>500 Internal Server Error</h1></body></html>"
+def page_key(path, query):
+    # Cache and ETag key: the path, plus the query for pages that use one,
+    # written the same way however the request spelled it
+    if path == "/":
+        return home_url(*home_params(query))
+    if path.startswith(SKILLS_PATH + "/"):
+        return skill_url(path_skill(path), query_page(query))
+    if path == API_ROSTER_PATH:
+        page = query_page(query)
+        return f"{path}?page={page}" if page > 1 else path
+    return path
+
+
+def find_portfolio(index, github_username):
+    return index.get(github_username.lower())
+
+
+NOT_FOUND_HTML = (
+    "<html><body><h1>404 Not Found</h1>"
+    "<p>The requested portfolio does not exist.</p></body></html>"
+)
+
+
+API_NOT_FOUND_JSON = '{"error": "Not Found"}'
+
+
+def page_slice(items, page, page_size=HOME_PAGE_SIZE):
+    # Returns (the items on this page, page count), or None past the last page
+    page_count = max(1, (len(items) + page_size - 1) // page_size)
+    if page > page_count:
+        return None
+    start = (page - 1) * page_size
+    return items[start : start + page_size], page_count
+
+
+def render_home_page(data, path, query):
+    search, page = home_params(query)
+    if search:
+        # Only the matching entries are looked at, and only this page is listed
+        entries = search_entries(data.search_words, data.search_postings, search)
+    else:
+        entries = data.entries
+    sliced = page_slice(entries, page)
+    if sliced is None:
+        return "404 Not Found", iter((NOT_FOUND_HTML,))
+
+    entries, page_count = sliced
+    if search:
+        entries = [data.entries[position] for position in entries]
+    pager = render_pager(page, page_count, lambda page: home_url(search, page))
+    return "200 OK", iter_home_page(entries, search, pager)
+
+
+def render_skill_page(data, path, query):
+    key = path_skill(path)
+    positions = data.skills.get(key)
+    sliced = page_slice(positions, query_page(query)) if positions else None
+    if sliced is None:
+        return "404 Not Found", iter((NOT_FOUND_HTML,))
+
+    page_positions, page_count = sliced
+    name = data.skill_names[key]
+    header = render_skill_header(
+        f"🛠️ {name}",
+        f'{len(positions)} portfolios list {name} · <a href="{SKILLS_PATH}">All skills</a>',
+    )
+    pager = render_pager(
+        query_page(query), page_count, lambda page: skill_url(key, page)
+    )
+    entries = [data.entries[position] for position in page_positions]
+    return "200 OK", iter_card_page(header, entries, pager)
+
+
+def render_api(data, path, query):
+    if path == API_ROSTER_PATH:
+        page = query_page(query)
+        sliced = page_slice(data.entries, page, API_PAGE_SIZE)
+        if sliced:
+            entries, page_count = sliced
+            roster = []
+            for username, portfolio in entries:
+                roster.append(
+                    {
+                        "github": portfolio[GITHUB],
+                        "fullName": portfolio[FULL_NAME],
+                        "title": portfolio[TITLE],
+                        "url": f"{API_PATH}/{username}",
+                    }
                 )
-                conn.send(error_response.encode())
-            finally:
-                # conn.close() # TODO: Check why closing connection causes issues
-                led.off()
-                gc.collect()
-    except KeyboardInterrupt:
-        print("\n Server stopped.")
-        led.off()
-        s.close()
+            body = {
+                "count": len(data.entries),
+                "page": page,
+                "pages": page_count,
+                "portfolios": roster,
+            }
+            return "200 OK", iter((json.dumps(body),))
+    else:
+        portfolio = find_portfolio(data.index, path[len(API_PATH) + 1 :])
+        if portfolio:
+            return "200 OK", iter((json.dumps(record_dict(portfolio)),))
+    return "404 Not Found", iter((API_NOT_FOUND_JSON,))
+
+
+def render_skills_index(data, path, query):
+    return "200 OK", iter_skills_page(data)
+
+
+def render_portfolio_page(data, path, query):
+    portfolio = find_portfolio(data.index, path.lstrip("/"))
+    if portfolio:
+        return "200 OK", iter_portfolio_html(portfolio)
+    return "404 Not Found", iter((NOT_FOUND_HTML,))
+
+
+def page_etag(data, key):
+    etag = data.etags.get(key)
+    if etag:
+        return etag
+    # Other home pages, searches and single-skill pages list cards that "/"
+    # or /skills already cover, so their tags derive from those
+    if key.startswith("/?"):
+        base = data.etags["/"]
+    elif key.startswith(SKILLS_PATH + "/"):
+        base = data.etags[SKILLS_PATH]
+    elif key.startswith(API_ROSTER_PATH):
+        base = data.etags[API_ROSTER_PATH]
+    elif is_api_path(key):
+        base = data.etags.get("/" + key[len(API_PATH) + 1 :])  # Same record
+        if not base:
+            return None
+    else:
+        return None
+    hasher = hashlib.sha256(base.encode())
+    hasher.update(key.encode())
+    return hasher_etag(hasher)
+
+
+def base_headers(key):
+    return API_HEADERS if is_api_path(key) else PAGE_HEADERS
+
+
+def page_headers(data, key, gzipped=False):
+    etag = page_etag(data, key)
+    if not etag:
+        return base_headers(key)
+    return f"{base_headers(key)}ETag: {gzip_etag(etag) if gzipped else etag}\r\n"
+
+
+def build_response(data, render, path, query, key):
+    # Returns (head, body, gzipped) where gzipped is a (head, body) pair or None.
+    # Only pages that go into the cache get a gzip copy; the rest are sent plain.
+    timer = stage_timer
+    if timer:
+        mark = time.ticks_us()
+    status, fragments = render(data, path, query)
+    log.debug(" Rendering %s (%s)", key, status)
+    body = "".join(fragments)  # The fragments are generated, and looked up, here
+    if timer:
+        mark = timer.lap(RENDER, mark)
+    body = body.encode()
+    if timer:
+        mark = timer.lap(ENCODE, mark)
+    if status != "200 OK":
+        head = response_head(status, len(body), HTML_CONTENT_TYPE, base_headers(key))
+        return head, body, None
+
+    # Only successful pages are cached, so unknown paths cannot flush real pages.
+    # Searches are not cached either: each visitor types their own. A page too
+    # big for the cache is not kept, so it is checked before compressing.
+    head = response_head(
+        "200 OK", len(body), HTML_CONTENT_TYPE, page_headers(data, key)
+    )
+    size = len(head) + len(body)
+    if "q=" in key or size > data.cache.max_bytes:
+        log.debug(" Serving %s plain, not cached", key)
+        return head, body, None
+
+    # Compress once here, so cache hits never pay for compression
+    gzipped = None
+    if GZIP_RESPONSES:
+        try:
+            headers = page_headers(data, key, gzipped=True)
+            gzipped = gzip_response("200 OK", body, headers, HTML_CONTENT_TYPE)
+        except Exception as e:
+            log.warning(" Could not compress %s: %s", key, e)
+        if timer:
+            timer.lap(COMPRESS, mark)
+
+    response = head, body, gzipped
+    if gzipped:
+        gzipped_size = len(gzipped[0]) + len(gzipped[1])
+        if data.cache.put(key, response, size + gzipped_size):
+            return response
+    # Without a gzip copy, or when the copy tipped it over the budget, only the
+    # plain page is kept; this client still gets the copy already made
+    data.cache.put(key, (head, body, None), size)
+    return response
+
+
+def api_response(data, path, query, key):
+    # API bodies are small JSON: only the body bytes are kept, under their own
+    # budget, and the short head is built per request. No gzip copy is kept.
+    body = data.api.get(key)
+    if body is None:
+        status, fragments = render_api(data, path, query)
+        log.debug(" Serialising %s (%s)", key, status)
+        body = "".join(fragments).encode()
+        if status != "200 OK":
+            head = response_head(status, len(body), JSON_CONTENT_TYPE, API_HEADERS)
+            return head, body
+        data.api.put(key, body, len(body))
+    else:
+        log.debug(" Serving stored JSON for: %s", key)
+    headers = page_headers(data, key)
+    head = response_head("200 OK", len(body), JSON_CONTENT_TYPE, headers)
+    return head, body
+
+
+def stream_response(data, render, path, query, key, chunked):
+    # Streams the page in small pieces so peak memory does not grow with the page
+    status, fragments = render(data, path, query)
+    log.debug(" Streaming %s (%s)", key, status)
+    headers = page_headers(data, key) if status == "200 OK" else base_headers(key)
+    if chunked:
+        head = response_head(status, None, headers=headers)
+        return head, iter_body(fragments, chunked=True)
+
+    # Without chunked encoding, a first pass measures the body, a second sends it
+    head = response_head(status, encoded_length(fragments), headers=headers)
+    return head, iter_body(render(data, path, query)[1])
+
+
+def serve_page(request, render):
+    # Route handler shared by every page: ETags, the response cache and gzip.
+    # render(data, path, query) returns (status, fragments), where fragments
+    # is a generator, so nothing is rendered until it is needed.
+    method, path, query, version, headers = request
+    key = page_key(path, query)
+    log.debug(" Requested path: %s %s", method, key)
+    data = snapshot  # One snapshot for the whole request, even if a refresh lands
+    use_gzip = GZIP_RESPONSES and accepts_gzip(headers.get("accept-encoding"))
+    if_none_match = headers.get("if-none-match")
+
+    # A matching validator means the browser's copy is current: skip rendering
+    etag = page_etag(data, key)
+    if etag and (
+        etag_matches(if_none_match, etag)
+        or etag_matches(if_none_match, gzip_etag(etag))
+    ):
+        log.debug(" Not modified: %s", key)
+        if use_gzip and not is_api_path(path):  # API bodies are never gzipped
+            etag = gzip_etag(etag)
+        return not_modified_head(etag, base_headers(key)), b""
+
+    # API bodies are small JSON, kept in their own store and never streamed
+    if is_api_path(path):
+        return api_response(data, path, query, key)
+
+    if RENDER_MODE != "buffered":
+        # HTTP/1.0 clients do not understand chunked bodies
+        chunked = RENDER_MODE == "chunked" and version == "HTTP/1.1"
+        return stream_response(data, render, path, query, key, chunked)
+
+    response = data.cache.get(key)
+    if response:
+        log.debug(" Serving cached response for: %s", key)
+    else:
+        response = build_response(data, render, path, query, key)
+    head, body, gzipped = response
+    if use_gzip and gzipped:
+        return gzipped
+    return head, body
+
+
+def page_route(render):
+    return lambda request: serve_page(request, render)
+
+
+def metrics_response(request):
+    # Server counters plus the state of the portfolio data and its cache
+    data = snapshot
+    lines = []
+    metrics.render(lines)
+    stats = data.cache.stats()
+    metric(
+        lines,
+        "portfolio_cache_hits_total",
+        "counter",
+        "Pages served from the response cache.",
+        [("", stats["hits"])],
+    )
+    metric(
+        lines,
+        "portfolio_cache_misses_total",
+        "counter",
+        "Pages that had to be rendered.",
+        [("", stats["misses"])],
+    )
+    metric(
+        lines,
+        "portfolio_cache_hit_ratio",
+        "gauge",
+        "Share of cache lookups that were hits.",
+        [("", stats["hit_ratio"])],
+    )
+    metric(
+        lines,
+        "portfolio_cache_bytes",
+        "gauge",
+        "Bytes held by cached pages.",
+        [("", stats["bytes"])],
+    )
+    metric(
+        lines,
+        "portfolio_records",
+        "gauge",
+        "Portfolios being served.",
+        [("", len(data.entries))],
+    )
+    if data.fetched_at:  # 0 until a fetch succeeds after boot
+        metric(
+            lines,
+            "portfolio_data_age_seconds",
+            "gauge",
+            "Seconds since GitHub last sent or confirmed the data.",
+            [("", time.time() - data.fetched_at)],
+        )
+    lines.append("")
+    body = "\n".join(lines).encode()
+    headers = "Cache-Control: no-store\r\n"
+    return response_head("200 OK", len(body), METRICS_CONTENT_TYPE, headers), body
+
+
+snapshot = PortfolioSnapshot([], 0)  # Replaced as a whole by fetch_portfolios_data
+
+router = Router(default=page_route(render_portfolio_page))  # /<username>
+router.add("/", page_route(render_home_page))
+router.add(STYLESHEET_PATH, stylesheet_response)
+router.add(SKILLS_PATH, page_route(render_skills_index))
+router.add_prefix(SKILLS_PATH + "/", page_route(render_skill_page))
+router.add_prefix(API_PATH + "/", page_route(render_api))
+router.add(METRICS_PATH, metrics_response)
+if stage_timer:
+    router.add(TIMING_PATH, timing_route(stage_timer))
+
+metrics = ServerMetrics(router.names)  # After the last route, it sizes the counters
+
+
+def prepare_server():
+    log.configure(LOG_LEVEL, LOG_FILE)
+    # The snapshot is read before Wi-Fi comes up, it needs neither
+    restored = restore_cached_data()
+
+    ip = connect_wifi(WIFI_SSID, WIFI_PASSWORD)
+    if not ip:
+        log.error("Could not connect to WiFi. Exiting...")
+        return None
+
+    if restored:
+        # Serve the snapshot now, the refresher revalidates it straight away
+        portfolios_data = snapshot.portfolios
+    else:
+        portfolios_data = fetch_portfolios_data()  # First boot: nothing to serve yet
+    start_background_refresh()
+
+    log.info("=" * 50)
+    log.info("\n Local server running on http://%s:80", ip)
+    log.info(" Loaded %d portfolios.", len(portfolios_data) if portfolios_data else 0)
+    log.info(" Press Ctrl+C to stop the server.\n")
+    log.info("=" * 50)
+    return ip
+
+
+def stop_server():
+    global background_refresh
+    background_refresh = False  # Lets the refresher thread finish
+    log.info("\n Server stopped.")
+    log.info(" Response cache stats: %s", snapshot.cache.stats())
+    if stage_timer:
+        stage_timer.print_report()
+    led.off()
+
+
+def refresh_between_requests():
+    if not background_refresh and refresh_due():
+        fetch_portfolios_data(force=True)  # No thread: refresh while nobody waits
+
+
+def start_portfolio_server(use_async=False):
+    # Blocking by default: one connection at a time, kept as a fallback
+    if not prepare_server():
+        return
+
+    server = Server(
+        router,
+        led,
+        KEEP_ALIVE,
+        KEEP_ALIVE_TIMEOUT,
+        KEEP_ALIVE_MAX_REQUESTS,
+        metrics=metrics,
+        timer=stage_timer,
+    )
+    run(
+        server,
+        use_async,
+        on_idle=refresh_between_requests,
+        on_stop=stop_server,
+        idle_interval=REFRESH_CHECK_INTERVAL,
+    )
+
+
+def start_portfolio_server_async():
+    # Concurrent server: a slow client only holds its own task, not the whole loop
+    start_portfolio_server(use_async=True)
 
 
 if __name__ == "__main__":
-    start_portfolio_server()
+    start_portfolio_server(USE_ASYNC_SERVER)
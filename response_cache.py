@@ -0,0 +1,68 @@
+from collections import OrderedDict
+
+RESPONSE_CACHE_BYTES = 48 * 1024  # Default byte budget for cached responses
+
+
+class ResponseCache:
+    """LRU cache of fully encoded HTTP responses with a byte budget"""
+
+    def __init__(self, max_bytes=RESPONSE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0  # Bytes currently held
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # Oldest entry first, newest last
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Re-insert so the entry moves to the most recently used end
+        del self._entries[key]
+        self._entries[key] = entry
+        return entry[0]
+
+    def put(self, key, data, size=None):
+        if size is None:
+            size = len(data)
+        if size > self.max_bytes:
+            return False  # Never let one response flush the whole cache
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+
+        # Evict least recently used entries until the new one fits
+        while self._entries and self.size + size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self.size -= self._entries.pop(oldest)[1]
+
+        self._entries[key] = (data, size)
+        self.size += size
+        return True
+
+    def carry_over(self, other, keep):
+        # Takes the entries keep() approves, and the running counters, from a
+        # cache that is being replaced
+        self.hits = other.hits
+        self.misses = other.misses
+        for key, (data, size) in list(other._entries.items()):
+            if keep(key):
+                self.put(key, data, size)
+
+    def clear(self):
+        self._entries = OrderedDict()
+        self.size = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,355 @@
+import socket
+import network
+import time
+import gc
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+from stage_timing import RECV, ROUTE, HANDLE, SEND, COLLECT
+from server_log import log
+from http_utils import (
+    RequestReader,
+    RequestError,
+    ResponseAborted,
+    parse_query,
+    wants_keep_alive,
+    error_response,
+    set_no_delay,
+    send_response,
+    write_response,
+)
+
+# What every web server here shares: joining Wi-Fi, finding the handler for
+# a path, and the blocking and asyncio serve loops with their keep-alive and
+# error handling. A server script only defines its routes and pages, so work
+# on this core speeds up all of them.
+#
+# A handler takes the request as (method, path, query, version, headers),
+# with the path lowercased and the query parsed into a dict, and returns
+# (head, body) where body is bytes or an iterator of pieces from iter_body.
+
+WIFI_CONNECT_ATTEMPTS = 10  # Seconds to wait for Wi-Fi before giving up
+ASYNC_BACKLOG = 10  # Pending connections the async server queues
+
+NOT_FOUND_RESPONSE = error_response("404 Not Found")
+METHOD_NOT_ALLOWED_RESPONSE = error_response("405 Method Not Allowed")
+SERVER_ERROR_RESPONSE = error_response("500 Internal Server Error")
+
+
+def connect_wifi(ssid, password):
+    wlan = network.WLAN(network.STA_IF)
+    wlan.active(True)
+    if wlan.isconnected():
+        ip = wlan.ifconfig()[0]
+        log.info(" Connected to WiFi. IP: %s", ip)
+        return ip
+
+    log.info(" Connecting to WiFi %s...", ssid)
+    wlan.connect(ssid, password)
+
+    for _ in range(WIFI_CONNECT_ATTEMPTS):
+        if wlan.isconnected():
+            ip = wlan.ifconfig()[0]
+            log.info(" Connected to WiFi. IP: %s", ip)
+            return ip
+        log.flush()  # Nothing else to do while waiting
+        time.sleep(1)
+        log.info(" Attempting to connect...")
+
+    log.error(" Failed to connect to WiFi.")
+    return None
+
+
+# Route numbers the Router always has: requests that failed before a route
+# was chosen, and paths no other route matches
+NO_ROUTE, DEFAULT_ROUTE = 0, 1
+
+
+class Router:
+    """Finds the route for a path: exact paths first, then prefixes"""
+
+    # Routes are numbered in the order they are added, so per-route counters
+    # can live in fixed-size lists
+
+    def __init__(self, default=None):
+        self.names = ["none", "default"]  # Route number -> name, for metrics
+        self.handlers = [None, default]  # Route number -> handler
+        self.routes = {}  # Exact path -> route number, one dict lookup per request
+        self.prefixes = []  # (prefix, route number), longest prefix first
+
+    def new_route(self, name, handler):
+        self.names.append(name)
+        self.handlers.append(handler)
+        return len(self.handlers) - 1
+
+    def add(self, path, handler):
+        self.routes[path] = self.new_route(path, handler)
+
+    def add_prefix(self, prefix, handler):
+        self.prefixes.append((prefix, self.new_route(prefix + "*", handler)))
+        self.prefixes.sort(key=lambda route: -len(route[0]))  # Most specific wins
+
+    def find(self, path):
+        route = self.routes.get(path)
+        if route is not None:
+            return route
+        for prefix, route in self.prefixes:
+            if path.startswith(prefix):
+                return route
+        return DEFAULT_ROUTE
+
+
+class Server:
+    """Answers HTTP requests with a Router's handlers, blocking or with asyncio"""
+
+    def __init__(
+        self,
+        router,
+        led=None,
+        keep_alive=False,
+        keep_alive_timeout=5,
+        keep_alive_max_requests=20,
+        port=80,
+        metrics=None,
+        timer=None,
+    ):
+        self.router = router
+        self.led = led  # Lit while a request is answered, if given
+        self.keep_alive = keep_alive  # True lets browsers reuse one connection
+        self.keep_alive_timeout = keep_alive_timeout  # Idle seconds before closing
+        self.keep_alive_max_requests = keep_alive_max_requests  # Per connection
+        self.port = port
+        self.metrics = metrics  # A ServerMetrics that counts every response, if given
+        self.timer = timer  # A StageTimer that times each stage of a request, if given
+        # Receive buffers: the blocking server uses one, the async server takes
+        # one per open connection from the spare ones and gives it back after
+        self.request_reader = RequestReader()
+        self.spare_request_readers = []
+
+    def respond(self, request, allow_keep_alive):
+        # Returns (route, head, body, keep_alive, head_only) for a request
+        # parsed by RequestReader. Paths are case-insensitive.
+        timer = self.timer
+        if timer:
+            mark = time.ticks_us()
+        method, path, query, version, headers = request
+        path = path.lower()
+        keep_alive = allow_keep_alive and wants_keep_alive(version, headers)
+        route = self.router.find(path)
+        if method != "GET" and method != "HEAD":
+            head, body = METHOD_NOT_ALLOWED_RESPONSE
+            return route, head, body, keep_alive, False
+
+        handler = self.router.handlers[route]
+        if handler is None:
+            head, body = NOT_FOUND_RESPONSE
+        else:
+            query = parse_query(query)
+            if timer:
+                mark = timer.lap(ROUTE, mark)
+            head, body = handler((method, path, query, version, headers))
+            if timer:
+                timer.lap(HANDLE, mark)
+        return route, head, body, keep_alive, method == "HEAD"
+
+    def count(self, route, head, started, sent):
+        if self.metrics:
+            self.metrics.record(route, head, started, sent)
+
+    def serve_connection(self, conn):
+        # Answers requests on one connection until it closes, idles out or hits the cap
+        conn.settimeout(self.keep_alive_timeout)
+        timer = self.timer
+        for served in range(1, self.keep_alive_max_requests + 1):
+            if timer:
+                mark = time.ticks_us()
+            try:
+                request = self.request_reader.recv(conn, self.keep_alive_timeout)
+            except RequestError as e:
+                log.info(" Bad request: %s", e.status)
+                started = time.ticks_ms()
+                head, body = error_response(e.status)
+                self.count(NO_ROUTE, head, started, send_response(conn, head, body))
+                return
+            if not request:
+                return
+            if timer:
+                timer.lap(RECV, mark)  # Includes waiting for the client
+
+            started = time.ticks_ms()
+            if self.led:
+                self.led.on()
+            try:
+                route, head, body, keep_alive, head_only = self.respond(
+                    request, self.keep_alive and served < self.keep_alive_max_requests
+                )
+                if timer:
+                    mark = time.ticks_us()
+                sent = send_response(conn, head, body, keep_alive, head_only)
+                if timer:
+                    timer.lap(SEND, mark)
+            finally:
+                if self.led:
+                    self.led.off()
+            self.count(route, head, started, sent)
+
+            if not keep_alive:
+                return
+
+    def serve(self, on_idle=None):
+        # Blocking server: one connection at a time. on_idle() runs between
+        # connections, for work that must not hold up a visitor. With
+        # keep_alive, a client that stays connected holds this loop for up to
+        # keep_alive_timeout seconds while everyone else waits, so keep-alive
+        # suits a single visitor here; serve_async() handles several.
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind(("0.0.0.0", self.port))
+        s.listen(5)
+
+        try:
+            while True:
+                conn, addr = s.accept()
+                log.debug(" Connection from %s", addr)
+                set_no_delay(conn)
+
+                try:
+                    self.serve_connection(conn)
+                except OSError as e:
+                    # Idle timeout or client reset
+                    log.debug(" Connection closed: %s", e)
+                except ResponseAborted as e:
+                    # Part of the body is out, so the connection is just closed
+                    log.error(" Error while sending a response: %s", e)
+                    self.count(NO_ROUTE, SERVER_ERROR_RESPONSE[0], time.ticks_ms(), 0)
+                except Exception as e:
+                    log.error(" Error processing request: %s", e)
+                    self.count(NO_ROUTE, SERVER_ERROR_RESPONSE[0], time.ticks_ms(), 0)
+                    try:
+                        send_response(conn, *SERVER_ERROR_RESPONSE)
+                    except OSError:
+                        pass  # Client already went away
+                finally:
+                    conn.close()
+                    self.collect()
+
+                log.flush()  # Between visitors, so nobody waits on the console
+                if on_idle:
+                    on_idle()
+        finally:
+            s.close()
+
+    def collect(self):
+        # Frees what the connection left behind, between connections
+        if self.timer:
+            mark = time.ticks_us()
+            gc.collect()
+            self.timer.lap(COLLECT, mark)
+        else:
+            gc.collect()
+
+    async def handle_client(self, reader, writer):
+        log.debug(" Connection from %s", writer.get_extra_info("peername"))
+        # MicroPython streams expose their socket; CPython's already has no delay
+        set_no_delay(getattr(writer, "s", None) or writer.get_extra_info("socket"))
+        spare = self.spare_request_readers
+        receiver = spare.pop() if spare else RequestReader()
+        receiver.reset()
+        timer = self.timer
+        try:
+            for served in range(1, self.keep_alive_max_requests + 1):
+                if timer:
+                    mark = time.ticks_us()
+                request = await asyncio.wait_for(
+                    receiver.read(reader), self.keep_alive_timeout
+                )
+                if not request:
+                    break  # Empty read means the client closed the connection
+                if timer:
+                    timer.lap(RECV, mark)  # Includes waiting for the client
+
+                started = time.ticks_ms()
+                if self.led:
+                    self.led.on()
+                try:
+                    route, head, body, keep_alive, head_only = self.respond(
+                        request,
+                        self.keep_alive and served < self.keep_alive_max_requests,
+                    )
+                    if timer:
+                        mark = time.ticks_us()
+                    sent = await write_response(
+                        writer, head, body, keep_alive, head_only
+                    )
+                    if timer:
+                        timer.lap(SEND, mark)
+                finally:
+                    if self.led:
+                        self.led.off()
+                self.count(route, head, started, sent)
+
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, OSError):
+            pass  # Idle keep-alive connection or client reset
+        except RequestError as e:
+            log.info(" Bad request: %s", e.status)
+            started = time.ticks_ms()
+            head, body = error_response(e.status)
+            try:
+                sent = await write_response(writer, head, body)
+                self.count(NO_ROUTE, head, started, sent)
+            except Exception:
+                pass  # Client already went away
+        except ResponseAborted as e:
+            # Part of the body is out, so the connection is just closed
+            log.error(" Error while sending a response: %s", e)
+            self.count(NO_ROUTE, SERVER_ERROR_RESPONSE[0], time.ticks_ms(), 0)
+        except Exception as e:
+            log.error(" Error processing request: %s", e)
+            self.count(NO_ROUTE, SERVER_ERROR_RESPONSE[0], time.ticks_ms(), 0)
+            try:
+                await write_response(writer, *SERVER_ERROR_RESPONSE)
+            except Exception:
+                pass  # Client already went away
+        finally:
+            spare.append(receiver)
+            writer.close()
+            await writer.wait_closed()
+            self.collect()
+
+    async def serve_async(self, on_idle=None, idle_interval=5):
+        # Concurrent server: a slow client only holds its own task, not the
+        # whole loop. on_idle() runs every idle_interval seconds.
+        await asyncio.start_server(
+            self.handle_client, "0.0.0.0", self.port, backlog=ASYNC_BACKLOG
+        )
+        while True:
+            # Connections are handled by the tasks start_server spawns
+            await asyncio.sleep(idle_interval)
+            log.flush()
+            if on_idle:
+                on_idle()
+
+
+def run(server, use_async=False, on_idle=None, on_stop=None, idle_interval=5):
+    # Serves until Ctrl+C, then calls on_stop()
+    if use_async and asyncio is None:
+        log.warning(" asyncio is not available, falling back to the blocking server.")
+        use_async = False
+    log.flush()  # Start-up messages, before the first visitor
+    try:
+        if use_async:
+            asyncio.run(server.serve_async(on_idle, idle_interval))
+        else:
+            server.serve(on_idle)
+    except KeyboardInterrupt:
+        if on_stop:
+            on_stop()
+    finally:
+        log.flush()
+        if use_async:
+            asyncio.new_event_loop()  # Reset asyncio state so the server can be restarted
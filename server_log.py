@@ -0,0 +1,149 @@
+import os
+import time
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+# Buffered, level-gated logging for the servers. A message below the level
+# costs one comparison and is never formatted. The rest go into a fixed ring
+# of slots and are written out by flush(), which the servers call between
+# connections, so a visitor never waits on the 115200 baud console.
+# Messages at FLUSH_LEVEL and above are written out at once. The ring is
+# shared with the background refresh thread, so it is only touched under a
+# lock, and messages are written out after the lock is released.
+#
+# Request-level messages are DEBUG, so the default INFO level keeps them
+# quiet. From the REPL: server_log.log.level = server_log.DEBUG
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+FLUSH_LEVEL = ERROR
+
+LOG_SLOTS = 64  # Messages held between flushes; older ones are dropped first
+LOG_FILE_BYTES = 16 * 1024  # A log file this big is moved to <path>.1
+
+
+def file_size(path):
+    try:
+        return os.stat(path)[6]
+    except OSError:
+        return 0  # No file yet
+
+
+class NoLock:
+    """Stands in for a lock on ports without _thread"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class RingLog:
+    """Holds log messages in a fixed ring until flush() writes them out"""
+
+    def __init__(self, level=INFO, size=LOG_SLOTS):
+        self.level = level  # Messages below this level are skipped
+        self.size = size
+        self.times = [0] * size
+        self.levels = bytearray(size)
+        self.messages = [None] * size
+        self.first = 0  # Slot of the oldest message not yet written out
+        self.count = 0  # Messages not yet written out
+        self.dropped = 0  # Messages overwritten before they were written out
+        self.console = True  # Write messages to the serial console
+        self.path = None  # Also append them to this file on flash, if set
+        self.max_file_bytes = LOG_FILE_BYTES
+        self.lock = _thread.allocate_lock() if _thread else NoLock()
+
+    def configure(self, level=INFO, path=None, console=True):
+        self.level = level
+        self.path = path
+        self.console = console
+
+    def log(self, level, message, *args):
+        # message % args is only formatted when the level is enabled
+        if level < self.level:
+            return
+        if args:
+            message = message % args
+        with self.lock:
+            slot = (self.first + self.count) % self.size
+            if self.count == self.size:
+                self.first = (self.first + 1) % self.size  # Full: drop the oldest
+                self.dropped += 1
+            else:
+                self.count += 1
+            self.times[slot] = int(time.time())
+            self.levels[slot] = level
+            self.messages[slot] = message
+        if level >= FLUSH_LEVEL:
+            self.flush()
+
+    def debug(self, message, *args):
+        self.log(DEBUG, message, *args)
+
+    def info(self, message, *args):
+        self.log(INFO, message, *args)
+
+    def warning(self, message, *args):
+        self.log(WARNING, message, *args)
+
+    def error(self, message, *args):
+        self.log(ERROR, message, *args)
+
+    def flush(self):
+        # Writes out every waiting message, oldest first. They are taken out
+        # of the ring under the lock, and printing happens after it, so a
+        # slow console never holds up a thread that logs.
+        with self.lock:
+            if not self.count and not self.dropped:
+                return
+            dropped = self.dropped
+            self.dropped = 0
+            waiting = []
+            while self.count:
+                slot = self.first
+                waiting.append(
+                    (self.times[slot], self.levels[slot], self.messages[slot])
+                )
+                self.messages[slot] = None
+                self.first = (slot + 1) % self.size
+                self.count -= 1
+        lines = [] if self.path else None
+        if dropped:
+            message = f" {dropped} log messages dropped"
+            self.emit(lines, int(time.time()), WARNING, message)
+        for when, level, message in waiting:
+            self.emit(lines, when, level, message)
+        if lines:
+            self.write_file(lines)
+
+    def emit(self, lines, when, level, message):
+        if self.console:
+            print(message)
+        if lines is not None:
+            lines.append(f"{when} {LEVEL_NAMES.get(level, level)} {message.strip()}\n")
+
+    def write_file(self, lines):
+        # One append per flush, then the file is rotated once it is too big
+        try:
+            with open(self.path, "a") as f:
+                for line in lines:
+                    f.write(line)
+            if file_size(self.path) > self.max_file_bytes:
+                old = self.path + ".1"
+                try:
+                    os.remove(old)  # MicroPython's rename does not replace files
+                except OSError:
+                    pass  # No older file yet
+                os.rename(self.path, old)
+        except OSError as e:
+            self.path = None  # Flash full or read-only: keep logging to the console
+            print(f" Could not write the log file: {e}")
+
+
+log = RingLog()  # Shared by the server modules
@@ -0,0 +1,140 @@
+import time
+import gc
+import network
+
+# Request counters for a Server, served as Prometheus text. Every counter
+# lives in a list sized when the routes are known, so counting a response
+# only overwrites small integers and never allocates.
+
+# Statuses that get their own counter; any other status is counted as "other"
+STATUS_CODES = (200, 304, 400, 404, 405, 414, 431, 500)
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+ZERO = 48  # ord("0"), for reading the status code out of a response head
+
+
+def wifi_rssi():
+    # Signal strength in dBm, or None when the port cannot tell
+    try:
+        wlan = network.WLAN(network.STA_IF)
+        return wlan.status("rssi") if wlan.isconnected() else None
+    except (AttributeError, OSError, ValueError, TypeError):
+        return None
+
+
+def metric(lines, name, kind, help_text, samples):
+    # Appends one metric family; samples is a list of (labels, value)
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+
+class ServerMetrics:
+    """Fixed-size request, status, latency and traffic counters"""
+
+    def __init__(self, route_names):
+        self.route_names = route_names  # Route number -> name, from the Router
+        self.status_index = {code: i for i, code in enumerate(STATUS_CODES)}
+        self.status_count = len(STATUS_CODES) + 1  # The last slot is "other"
+        # requests[route * status_count + status] counts responses
+        self.requests = [0] * (len(route_names) * self.status_count)
+        # Responses per latency bucket, the last one catching everything slower
+        self.latency = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.latency_ms = 0  # Sum of all latencies
+        self.bytes_sent = 0
+        self.started = time.time()
+
+    def record(self, route, head, started, sent):
+        # Counts one response: route number, its head bytes, the ticks_ms()
+        # it was started at and how many bytes went out
+        code = (head[9] - ZERO) * 100 + (head[10] - ZERO) * 10 + head[11] - ZERO
+        status = self.status_index.get(code, self.status_count - 1)
+        self.requests[route * self.status_count + status] += 1
+
+        elapsed = time.ticks_diff(time.ticks_ms(), started)
+        buckets = LATENCY_BUCKETS_MS
+        bucket = 0
+        while bucket < len(buckets) and elapsed > buckets[bucket]:
+            bucket += 1
+        self.latency[bucket] += 1
+        self.latency_ms += elapsed
+        self.bytes_sent += sent
+
+    def render(self, lines):
+        # Appends the server's metrics to lines, as Prometheus text lines
+        samples = []
+        codes = STATUS_CODES + ("other",)
+        for route, name in enumerate(self.route_names):
+            for status, code in enumerate(codes):
+                count = self.requests[route * self.status_count + status]
+                if count:
+                    samples.append((f'route="{name}",status="{code}"', count))
+        metric(
+            lines,
+            "http_requests_total",
+            "counter",
+            "Responses sent, by route and status.",
+            samples,
+        )
+
+        samples = []
+        total = 0
+        for bucket, bound in enumerate(LATENCY_BUCKETS_MS):
+            total += self.latency[bucket]
+            samples.append((f'le="{bound / 1000}"', total))
+        total += self.latency[-1]
+        samples.append(('le="+Inf"', total))
+        lines.append("# HELP http_request_duration_seconds Time to answer a request.")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for labels, value in samples:
+            lines.append(f"http_request_duration_seconds_bucket{{{labels}}} {value}")
+        lines.append(f"http_request_duration_seconds_sum {self.latency_ms / 1000}")
+        lines.append(f"http_request_duration_seconds_count {total}")
+
+        metric(
+            lines,
+            "http_response_bytes_total",
+            "counter",
+            "Bytes sent in responses, heads included.",
+            [("", self.bytes_sent)],
+        )
+        metric(
+            lines,
+            "process_uptime_seconds",
+            "gauge",
+            "Seconds since the server started counting.",
+            [("", int(time.time() - self.started))],
+        )
+
+        try:
+            metric(
+                lines,
+                "heap_free_bytes",
+                "gauge",
+                "Free heap, from gc.mem_free().",
+                [("", gc.mem_free())],
+            )
+            metric(
+                lines,
+                "heap_allocated_bytes",
+                "gauge",
+                "Allocated heap, from gc.mem_alloc().",
+                [("", gc.mem_alloc())],
+            )
+        except AttributeError:
+            pass  # CPython has no heap counters
+
+        rssi = wifi_rssi()
+        if rssi is not None:
+            metric(
+                lines,
+                "wifi_rssi_dbm",
+                "gauge",
+                "Wi-Fi signal strength.",
+                [("", rssi)],
+            )
@@ -1,15 +1,20 @@
-import socket
-import network
 import time
-import gc
 from machine import Pin
 import urequests
+from portfolio_style import STYLESHEET_LINK, STYLESHEET_PATH, stylesheet_response
+from http_utils import html_response
+from server_core import Router, Server, connect_wifi, run
+from stage_timing import StageTimer, TIMING_PATH, timing_route
+from server_log import log
 
 led = Pin(2, Pin.OUT)  # On-board LED for status indication
 
 WIFI_SSID = "YOUR_WIFI_NAME"  # TODO: Replace with your WiFi SSID
 WIFI_PASSWORD = "YOUR_WIFI_PASSWORD"  # TODO: Replace with your WiFi password
 
+STAGE_TIMING = False  # True times each stage of every request, see TIMING_PATH
+stage_timer = StageTimer() if STAGE_TIMING else None
+
 GITHUB_USERNAME = "your_github_username"  # TODO: Replace with your GitHub username
 GITHUB_REPO = "your_repository_name"  # TODO: Replace with your repository name
 GITHUB_FILEPATH = "path/to/your/file.json"  # TODO: Replace with the path to your JSON file in the repo
@@ -20,54 +25,37 @@ portfolio_cache = None
 last_fetch_time = 0
 CACHE_DURATION = 300  # Cache duration in seconds (5 minutes)
 
-
-def connect_wifi():
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-    if wlan.isconnected():
-        ip = wlan.ifconfig()[0]
-        print(f" Connected to WiFi. IP: {ip}")
-        return ip
-
-    print(f" Connecting to WiFi {WIFI_SSID}...")
-    wlan.connect(WIFI_SSID, WIFI_PASSWORD)
-
-    for _ in range(10):
-        if wlan.isconnected():
-            ip = wlan.ifconfig()[0]
-            print(f" Connected to WiFi. IP: {ip}")
-            return ip
-        time.sleep(1)
-        print(" Attempting to connect...")
-
-    print(" Failed to connect to WiFi.")
-    return None
+KEEP_ALIVE = False  # True lets browsers reuse one connection for several requests
+# The server answers nobody else while a kept-alive visitor idles, up to
+# KEEP_ALIVE_TIMEOUT, so leave it off when several people visit at once
+KEEP_ALIVE_TIMEOUT = 5  # Seconds a connection may sit idle before it is closed
+KEEP_ALIVE_MAX_REQUESTS = 20  # Requests served per connection before closing it
 
 
 def fetch_portfolio_data():
     global portfolio_cache, last_fetch_time
     current_time = time.time()
     if portfolio_cache and (current_time - last_fetch_time < CACHE_DURATION):
-        print(" Using cached portfolio data.")
+        log.debug(" Using cached portfolio data.")
         return portfolio_cache
 
-    print(" Fetching portfolio data from GitHub...")
-    print(f" URL: {GITHUB_URL}")
+    log.info(" Fetching portfolio data from GitHub...")
+    log.info(" URL: %s", GITHUB_URL)
 
     try:
         response = urequests.get(GITHUB_URL)
         if response.status_code == 200:
             portfolio_cache = response.json()
             last_fetch_time = current_time
-            print(" Portfolio data fetched successfully.")
+            log.info(" Portfolio data fetched successfully.")
             response.close()
             return portfolio_cache
         else:
-            print(f" Failed to fetch data. Status code: {response.status_code}")
+            log.warning(" Failed to fetch data. Status code: %d", response.status_code)
             response.close()
             return None
     except Exception as e:
-        print(f" Exception occurred while fetching data: {e}")
+        log.warning(" Exception occurred while fetching data: %s", e)
         return None
 
 
@@ -130,167 +118,9 @@ def generate_portfolio_html(data):
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{full_name} - Portfolio</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-        }}
-
-        .container {{
-            max-width: 800px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-
-        header {{
-            background: white;
-            border-radius: 20px;
-            padding: 40px;
-            text-align: center;
-            margin-bottom: 30px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-        }}
-
-        .profile-pic {{
-            width: 120px;
-            height: 120px;
-            border-radius: 50%;
-            background: linear-gradient(135deg, #667eea, #764ba2);
-            margin: 0 auto 20px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 48px;
-            color: white;
-        }}
-
-        h1 {{
-            color: #333;
-            margin-bottom: 10px;
-            font-size: 2.5em;
-        }}
-
-        .title {{
-            color: #666;
-            font-size: 1.2em;
-            margin-bottom: 20px;
-        }}
-
-        .social-links {{
-            display: flex;
-            justify-content: center;
-            gap: 20px;
-            margin-bottom: 20px;
-            flex-wrap: wrap;
-        }}
-
-        .social-links a {{
-            padding: 10px 20px;
-            background: #667eea;
-            color: white;
-            text-decoration: none;
-            border-radius: 25px;
-            transition: transform 0.3s;
-        }}
-
-        .social-links a:hover {{
-            transform: translateY(-2px);
-        }}
-
-        .section {{
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            margin-bottom: 20px;
-            box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-        }}
-
-        h2 {{
-            color: #667eea;
-            margin-bottom: 15px;
-            font-size: 1.8em;
-        }}
-
-        .about {{
-            font-size: 1.1em;
-            color: #555;
-            line-height: 1.8;
-        }}
-
-        .skills {{
-            display: flex;
-            flex-wrap: wrap;
-            gap: 10px;
-            margin-top: 15px;
-        }}
-
-        .skill {{
-            background: linear-gradient(135deg, #667eea, #764ba2);
-            color: white;
-            padding: 8px 16px;
-            border-radius: 20px;
-            font-size: 0.9em;
-        }}
-
-        .project {{
-            border-left: 4px solid #667eea;
-            padding-left: 20px;
-            margin-bottom: 20px;
-        }}
-
-        .project h3 {{
-            color: #333;
-            margin-bottom: 8px;
-        }}
-
-        .project p {{
-            color: #666;
-            margin-bottom: 10px;
-        }}
-
-        .project a {{
-            color: #667eea;
-            text-decoration: none;
-            font-weight: 600;
-        }}
-
-        .project a:hover {{
-            text-decoration: underline;
-        }}
-
-        .footer {{
-            text-align: center;
-            color: white;
-            padding: 20px;
-            font-size: 0.9em;
-        }}
-
-        .esp32-badge {{
-            background: rgba(255,255,255,0.2);
-            color: white;
-            padding: 5px 15px;
-            border-radius: 15px;
-            display: inline-block;
-            margin-top: 10px;
-        }}
-
-        @media (max-width: 600px) {{
-            h1 {{ font-size: 1.8em; }}
-            .social-links {{ flex-direction: column; }}
-            .container {{ padding: 10px; }}
-        }}
-    </style>
+    {STYLESHEET_LINK}
 </head>
-<body>
+<body class="portfolio">
     <div class="container">
         <header>
             <div class="profile-pic">{full_name[0]}</div>
@@ -321,55 +151,48 @@ def generate_portfolio_html(data):
     return html
 
 
+def portfolio_page(request):
+    return html_response("200 OK", generate_portfolio_html(portfolio_cache))
+
+
+router = Router(default=portfolio_page)  # Every other path shows the portfolio
+router.add(STYLESHEET_PATH, stylesheet_response)
+if stage_timer:
+    router.add(TIMING_PATH, timing_route(stage_timer))
+
+
+def stop_server():
+    log.info("\n Server stopped.")
+    led.off()
+    if stage_timer:
+        stage_timer.print_report()
+
+
 def start_portfolio_server():
-    ip = connect_wifi()
+    ip = connect_wifi(WIFI_SSID, WIFI_PASSWORD)
     if not ip:
-        print("Could not connect to WiFi. Exiting...")
+        log.error("Could not connect to WiFi. Exiting...")
         return
 
     portfolio_data = fetch_portfolio_data()
     if not portfolio_data:
-        print("Could not fetch portfolio data. Exiting...")
+        log.error("Could not fetch portfolio data. Exiting...")
         return
 
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind(("0.0.0.0", 80))
-    s.listen(5)
-
-    print("=" * 50)
-    print(f"\n Local server running on http://{ip}:80")
-    print(" Press Ctrl+C to stop the server.\n")
-    print("=" * 50)
-
-    try:
-        while True:
-            conn, addr = s.accept()
-            print(f" Connection from {addr}")
-            led.on()
-
-            try:
-                html_content = generate_portfolio_html(portfolio_data)
-                http_response = (
-                    "HTTP/1.1 200 OK\nContent-Type: text/html\nConnection: close\n\n"
-                )
-                http_response += html_content
-                conn.sendall(http_response.encode())
-            except Exception as e:
-                print(f" Error processing request: {e}")
-                error_response = "HTTP/1.1 500 Internal Server Error\nContent-Type: text/html\nConnection: close\n\n"
-                error_response += (
-                    "<html><body><h1>500 Internal Server Error</h1></body></html>"
-                )
-                conn.sendall(error_response.encode())
-            finally:
-                # conn.close() # TODO: Check why closing connection causes issues
-                led.off()
-                gc.collect()
-    except KeyboardInterrupt:
-        print("\n Server stopped.")
-        led.off()
-        s.close()
+    log.info("=" * 50)
+    log.info("\n Local server running on http://%s:80", ip)
+    log.info(" Press Ctrl+C to stop the server.\n")
+    log.info("=" * 50)
+
+    server = Server(
+        router,
+        led,
+        KEEP_ALIVE,
+        KEEP_ALIVE_TIMEOUT,
+        KEEP_ALIVE_MAX_REQUESTS,
+        timer=stage_timer,
+    )
+    run(server, on_stop=stop_server)
 
 
 if __name__ == "__main__":
@@ -1,35 +1,16 @@
-import socket
-import network
-import time
 from machine import Pin
+from http_utils import html_response
+from server_core import Router, Server, connect_wifi, run
+from stage_timing import StageTimer, TIMING_PATH, timing_route
+from server_log import log
 
 led = Pin(2, Pin.OUT)  # On-board LED for status indication
 
 WIFI_SSID = "YOUR_WIFI_NAME"  # TODO: Replace with your WiFi SSID
 WIFI_PASSWORD = "YOUR_WIFI_PASSWORD"  # TODO: Replace with your WiFi password
 
-
-def connect_wifi():
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-    if wlan.isconnected():
-        ip = wlan.ifconfig()[0]
-        print(f" Connected to WiFi. IP: {ip}")
-        return ip
-
-    print(f" Connecting to WiFi {WIFI_SSID}...")
-    wlan.connect(WIFI_SSID, WIFI_PASSWORD)
-
-    for _ in range(10):
-        if wlan.isconnected():
-            ip = wlan.ifconfig()[0]
-            print(f" Connected to WiFi. IP: {ip}")
-            return ip
-        time.sleep(1)
-        print(" Attempting to connect...")
-
-    print(" Failed to connect to WiFi.")
-    return None
+STAGE_TIMING = False  # True times each stage of every request, see TIMING_PATH
+stage_timer = StageTimer() if STAGE_TIMING else None
 
 
 def web_page():
@@ -61,52 +42,50 @@ def web_page():
     return html
 
 
-def start_server():
-    ip = connect_wifi()
-    if not ip:
-        print("Could not connect to WiFi. Exiting...")
-        return
+def status_page(request):
+    return html_response("200 OK", web_page())
 
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind(("0.0.0.0", 80))
-    s.listen(5)
-    print(f"\n Listening on http://{ip}:80")
-    print(" Press Ctrl+C to stop the server.\n")
 
-    try:
-        while True:
-            conn, addr = s.accept()
-            print(f" Connection from {addr}")
+def turn_on(request):
+    led.on()
+    log.debug(" LED turned ON")
+    return status_page(request)
 
-            request = conn.recv(1024).decode()
 
-            if "/on" in request:
-                led.on()
-                print(" LED turned ON")
-            elif "/off" in request:
-                led.off()
-                print(" LED turned OFF")
+def turn_off(request):
+    led.off()
+    log.debug(" LED turned OFF")
+    return status_page(request)
 
-            response = "HTTP/1.1 200 OK\nContent-Type: text/html\nConnection: close\n\n"
-            response += web_page()
 
-            conn.sendall(response.encode())
-            conn.close()
-    except KeyboardInterrupt:
-        print(" Server stopped.")
-        led.off()
-        s.close()
+# Only the path counts, so a header that mentions /on cannot toggle the LED
+router = Router(default=status_page)
+router.add("/on", turn_on)
+router.add("/off", turn_off)
+if stage_timer:
+    router.add(TIMING_PATH, timing_route(stage_timer))
 
 
 # AI generated:
 def stop_server():
     led.off()
-    print(" Server stopped and LED turned OFF.")
+    log.info(" Server stopped and LED turned OFF.")
+    if stage_timer:
+        stage_timer.print_report()
+
+
+def start_server():
+    ip = connect_wifi(WIFI_SSID, WIFI_PASSWORD)
+    if not ip:
+        log.error("Could not connect to WiFi. Exiting...")
+        return
+
+    log.info("\n Listening on http://%s:80", ip)
+    log.info(" Press Ctrl+C to stop the server.\n")
+
+    # No status LED: the LED is what this server switches
+    run(Server(router, timer=stage_timer), on_stop=stop_server)
 
 
 if __name__ == "__main__":
-    try:
-        start_server()
-    except KeyboardInterrupt:
-        stop_server()
+    start_server()
@@ -0,0 +1,88 @@
+import time
+from array import array
+from http_utils import response_head
+
+# Optional per-stage timing for the request loop. Each stage keeps its last
+# STAGE_SAMPLES durations in microseconds in a preallocated ring, so timing a
+# stage costs two ticks_us() calls and an array store. Servers hold None
+# instead of a StageTimer when timing is off, which leaves one truth test per
+# stage on the hot path.
+#
+# From the REPL: server_module.stage_timer.print_report()
+
+STAGE_SAMPLES = 128  # Durations kept per stage; older ones are overwritten
+TIMING_PATH = "/debug/timing"  # Route servers may add for the report
+
+# Stages the shared server core times; a server appends its own after these
+RECV, ROUTE, HANDLE, SEND, COLLECT = range(5)
+CORE_STAGES = ("recv", "route", "handle", "send", "gc")
+
+
+def percentile(ordered, fraction):
+    # Nearest-rank percentile of an already sorted sequence
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class StageTimer:
+    """Ring buffers of the latest durations of each request stage"""
+
+    def __init__(self, stages=CORE_STAGES, size=STAGE_SAMPLES):
+        self.stages = stages  # Stage number -> name
+        self.size = size
+        self.samples = [array("i", [0] * size) for _ in stages]
+        self.counts = [0] * len(stages)  # Durations recorded per stage, ever
+
+    def record(self, stage, elapsed_us):
+        count = self.counts[stage]
+        self.samples[stage][count % self.size] = elapsed_us
+        self.counts[stage] = count + 1
+
+    def lap(self, stage, mark):
+        # Records the time since mark, a ticks_us() value, and returns now,
+        # so consecutive stages chain: mark = timer.lap(STAGE, mark)
+        now = time.ticks_us()
+        self.record(stage, time.ticks_diff(now, mark))
+        return now
+
+    def summary(self):
+        # [(name, count, p50, p95, p99)] in microseconds, for stages with samples
+        rows = []
+        for stage, name in enumerate(self.stages):
+            count = self.counts[stage]
+            if not count:
+                continue
+            ordered = sorted(self.samples[stage][: min(count, self.size)])
+            rows.append(
+                (
+                    name,
+                    count,
+                    percentile(ordered, 0.5),
+                    percentile(ordered, 0.95),
+                    percentile(ordered, 0.99),
+                )
+            )
+        return rows
+
+    def report(self):
+        lines = ["stage      count    p50 us    p95 us    p99 us"]
+        for name, count, p50, p95, p99 in self.summary():
+            lines.append(f"{name:8} {count:7d} {p50:9d} {p95:9d} {p99:9d}")
+        return "\n".join(lines) + "\n"
+
+    def print_report(self):
+        print(self.report())
+
+    def reset(self):
+        for stage in range(len(self.stages)):
+            self.counts[stage] = 0
+
+
+def timing_route(timer):
+    # Route handler that serves the timer's report as plain text
+    def timing_response(request):
+        body = timer.report().encode()
+        headers = "Cache-Control: no-store\r\n"
+        head = response_head("200 OK", len(body), "text/plain; charset=utf-8", headers)
+        return head, body
+
+    return timing_response